@@ -0,0 +1,88 @@
+# ==========================================
+# Архив старых месяцев хранилища
+# Записи старше нескольких последних месяцев уходят из data.json в сжатые
+# помесячные файлы archive/ГГГГ-ММ.json.gz и подгружаются по требованию
+# ==========================================
+import gzip
+import json
+import os
+import threading
+
+from persist import atomic_write
+from sync import shard_key
+
+
+class MonthArchive:
+    """Помесячные файлы с записями целиком (в формате data.json), сжатые gzip.
+
+    Файл месяца переписывается, только когда в него переезжают записи
+    (раз в месяц, при сдвиге окна последних месяцев) или из него удаляют
+    запись, поэтому ежедневные запуски парсера архив не трогают.
+    """
+
+    def __init__(self, path="archive"):
+        self.path = path
+        # Файл месяца читается и переписывается целиком: add (архивация) и
+        # remove (поток писателя) не должны делать это одновременно
+        self.lock = threading.Lock()
+        # Список месяцев читается с диска один раз, дальше его ведет _save
+        self._months = None
+
+    def _file(self, month):
+        return os.path.join(self.path, month + ".json.gz")
+
+    def months(self):
+        """Месяцы в архиве, от новых к старым (без обращения к диску, кроме первого раза)"""
+        months = self._months
+        if months is None:
+            try:
+                names = os.listdir(self.path)
+            except OSError:
+                names = []
+            months = sorted((name[:-len(".json.gz")] for name in names if name.endswith(".json.gz")), reverse=True)
+            self._months = months
+        return list(months)
+
+    def load(self, month):
+        try:
+            with gzip.open(self._file(month), 'rt', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, EOFError, ValueError):
+            return []
+
+    def add(self, entries):
+        """Дописывает записи в файлы их месяцев (запись с тем же id заменяется)"""
+        groups = {}
+        for entry in entries:
+            groups.setdefault(shard_key(entry), []).append(entry)
+        for month, new in groups.items():
+            with self.lock:
+                merged = {entry['id']: entry for entry in self.load(month)}
+                merged.update((entry['id'], entry) for entry in new)
+                self._save(month, list(merged.values()))
+        return sorted(groups)
+
+    def remove(self, month, entry_ids):
+        """Удаляет записи с id из entry_ids из файла месяца"""
+        entry_ids = set(entry_ids)
+        with self.lock:
+            entries = self.load(month)
+            kept = [entry for entry in entries if entry['id'] not in entry_ids]
+            if len(kept) != len(entries):
+                self._save(month, kept)
+
+    def _save(self, month, entries):
+        path = self._file(month)
+        months = set(self.months())
+        if not entries:
+            if os.path.exists(path):
+                os.remove(path)
+            months.discard(month)
+        else:
+            os.makedirs(self.path, exist_ok=True)
+            data = json.dumps(sorted(entries, key=lambda e: e['id']), ensure_ascii=False, separators=(',', ':'))
+            # mtime=0: одинаковые записи дают одинаковый файл, git не видит лишних изменений
+            atomic_write(path, gzip.compress(data.encode('utf-8'), 9, mtime=0))
+            months.add(month)
+        # Новый список целиком: читатели в других потоках видят старый или новый
+        self._months = sorted(months, reverse=True)
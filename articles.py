@@ -0,0 +1,169 @@
+# ==========================================
+# Кэш текста статей и очередь повторных попыток для парсера
+# Текст статьи скачивается один раз и хранится на диске по URL,
+# а статьи, которые не удалось скачать, пробуются снова в следующих запусках
+# ==========================================
+import hashlib
+import json
+import os
+import threading
+import time
+
+import requests
+
+from persist import atomic_write
+
+
+def is_transient(error):
+    """Стоит ли повторять запрос: обрыв связи, таймаут, 429 и ошибки сервера 5xx"""
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+class ContentCache:
+    """Текст статей на диске, по одному файлу на URL.
+
+    Запись старше ttl секунд считается устаревшей. Общий объем ограничен
+    max_bytes: при переполнении удаляются файлы, которые дольше всего не
+    читались (время последнего чтения - mtime файла, его обновляет get).
+    """
+
+    def __init__(self, cache_dir=".article_cache", ttl=7 * 24 * 3600, max_bytes=20 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self.sizes = {}  # имя файла -> размер
+        for item in os.scandir(cache_dir):
+            if item.name.endswith(".json"):
+                self.sizes[item.name] = item.stat().st_size
+        self.total = sum(self.sizes.values())
+
+    def _name(self, url):
+        return hashlib.sha1(url.encode('utf-8')).hexdigest() + ".json"
+
+    def get(self, url):
+        name = self._name(url)
+        path = os.path.join(self.cache_dir, name)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get('url') != url or time.time() - data.get('fetched_at', 0) > self.ttl:
+            self._remove(name)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data.get('text')
+
+    def put(self, url, text):
+        name = self._name(url)
+        path = os.path.join(self.cache_dir, name)
+        body = json.dumps({"url": url, "fetched_at": time.time(), "text": text}, ensure_ascii=False).encode('utf-8')
+        atomic_write(path, body)
+        with self.lock:
+            self.total += len(body) - self.sizes.get(name, 0)
+            self.sizes[name] = len(body)
+            if self.total > self.max_bytes:
+                self._evict()
+
+    def _remove(self, name):
+        try:
+            os.remove(os.path.join(self.cache_dir, name))
+        except OSError:
+            pass
+        with self.lock:
+            self.total -= self.sizes.pop(name, 0)
+
+    def _evict(self):
+        """Удаляет самые давно читанные файлы, пока кэш не станет на четверть меньше лимита"""
+        def last_used(name):
+            try:
+                return os.path.getmtime(os.path.join(self.cache_dir, name))
+            except OSError:
+                return 0
+        target = self.max_bytes * 3 // 4
+        for name in sorted(self.sizes, key=last_used):
+            if self.total <= target:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+            self.total -= self.sizes.pop(name)
+
+
+class RetryQueue:
+    """Статьи, которые не удалось скачать, с паузой между попытками.
+
+    Вместо текста ошибки в data.json строка списка откладывается сюда и
+    снова отдается источнику через due(), когда подошло время: пауза растет
+    вдвое с каждой неудачей (base_delay, 2*base_delay, ...). После
+    max_attempts неудач статья убирается из очереди.
+    """
+
+    def __init__(self, path="retry_queue.json", max_attempts=5, base_delay=3600):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.items = {}  # url -> {"source", "row", "attempts", "next_try", "error"}
+        self.lock = threading.Lock()
+        self.dirty = False
+
+    def load(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.items = json.load(f)
+            except (OSError, ValueError):
+                self.items = {}
+        return self
+
+    def due(self, source, now=None):
+        """Строки списка источника, которые пора попробовать снова"""
+        now = time.time() if now is None else now
+        with self.lock:
+            return [
+                item['row'] for item in self.items.values()
+                if item['source'] == source and item['next_try'] <= now
+            ]
+
+    def add(self, source, row, error):
+        """Запоминает неудачу; возвращает False, если попытки кончились"""
+        with self.lock:
+            item = self.items.get(row['url']) or {"source": source, "row": row, "attempts": 0}
+            item['attempts'] += 1
+            item['error'] = str(error)
+            item['next_try'] = time.time() + self.base_delay * 2 ** (item['attempts'] - 1)
+            self.dirty = True
+            if item['attempts'] >= self.max_attempts:
+                self.items.pop(row['url'], None)
+                return False
+            self.items[row['url']] = item
+            return True
+
+    def discard(self, url):
+        with self.lock:
+            if self.items.pop(url, None) is not None:
+                self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        with self.lock:
+            data = json.dumps(self.items, ensure_ascii=False, indent=2)
+            self.dirty = False
+        atomic_write(self.path, data)
+
+    def __contains__(self, url):
+        with self.lock:
+            return url in self.items
+
+    def __len__(self):
+        return len(self.items)
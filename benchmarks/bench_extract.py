@@ -0,0 +1,105 @@
+# ==========================================
+# Бенчмарк извлечения данных из HTML
+# Сравнивает процессорное время на страницу: полный разбор (как было раньше)
+# и частичный разбор через extract.py с разными бэкендами
+#
+# Запуск из корня проекта:  python benchmarks/bench_extract.py [-n 50] [--json]
+# ==========================================
+import argparse
+import json
+import os
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import extract  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+# --- Старый способ: весь документ в дерево, поиск через find ---
+def full_python_org(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    rows = []
+    for p in soup.find('ul', class_='list-recent-posts').find_all('li'):
+        link_tag = p.find('a')
+        rows.append((link_tag.text, link_tag['href'], p.find('time').get('datetime')[:10]))
+    return rows
+
+
+def full_hacker_news(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    rows = []
+    for line in soup.find_all('tr', class_='athing'):
+        link_tag = line.find('span', class_='titleline').find('a')
+        rows.append((link_tag.text, link_tag['href']))
+    return rows
+
+
+def full_article(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    content_div = soup.find('div', class_='main-content') or soup.find('section', class_='main-content')
+    text_parts = []
+    for p in content_div.find_all('p'):
+        text = p.text.strip()
+        if len(text) > 40:
+            text_parts.append(text)
+        if len(text_parts) >= 3:
+            break
+    return text_parts
+
+
+# --- Новый способ: частичный разбор ---
+def partial(func, extractor, backend):
+    ex = extract.Extractor(extractor.strainer, extractor.selector.pattern, backend)
+    return lambda html: func(html, extractor=ex)
+
+
+def cpu_time_per_call(func, html, repeat):
+    func(html)  # прогрев
+    start = time.process_time()
+    for _ in range(repeat):
+        func(html)
+    return (time.process_time() - start) / repeat
+
+
+def main():
+    cli = argparse.ArgumentParser(description="Бенчмарк извлечения данных из HTML")
+    cli.add_argument("-n", "--repeat", type=int, default=30, help="сколько раз разбирать каждую страницу")
+    cli.add_argument("--json", action="store_true", help="вывести результат в JSON")
+    args = cli.parse_args()
+
+    backends = ["html.parser"]
+    if extract.DEFAULT_BACKEND == "lxml":
+        backends.append("lxml")
+
+    pages = [
+        ("python_org_blogs.html", full_python_org, extract.extract_python_org_listing, extract.PYTHON_ORG_LISTING),
+        ("hacker_news.html", full_hacker_news, extract.extract_hn_listing, extract.HN_LISTING),
+        ("article.html", full_article, extract.extract_article, extract.ARTICLE_BODY),
+    ]
+    results = []
+    for name, full, func, extractor in pages:
+        with open(os.path.join(FIXTURES, name), 'r', encoding='utf-8') as f:
+            html = f.read()
+        row = {"page": name, "bytes": len(html.encode('utf-8')), "full_ms": cpu_time_per_call(full, html, args.repeat) * 1000}
+        for backend in backends:
+            row[f"partial_{backend}_ms"] = cpu_time_per_call(partial(func, extractor, backend), html, args.repeat) * 1000
+        results.append(row)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'страница':24} {'размер':>8} {'полный':>9}" + "".join(f" {b:>12}" for b in backends))
+    for row in results:
+        line = f"{row['page']:24} {row['bytes']:>8} {row['full_ms']:>7.2f}ms"
+        for backend in backends:
+            ms = row[f"partial_{backend}_ms"]
+            line += f" {ms:>6.2f}ms x{row['full_ms'] / ms:<3.1f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# ==========================================
+# Генератор синтетического data.json для бенчмарков
+# Запуск: python benchmarks/gen_data.py 100000 -o /tmp/data.json
+# ==========================================
+import argparse
+import json
+import random
+from datetime import date, timedelta
+
+WORDS = (
+    "python rust linux kernel release security open source database compiler "
+    "browser startup model data network cloud memory performance language "
+    "framework library apple google microsoft research paper hardware chip "
+    "язык программирование новости релиз обновление безопасность сервер "
+    "приложение разработка интерфейс данные поиск справочник"
+).split()
+
+# Распределение категорий примерно как в настоящем data.json
+CATEGORIES = [("Новости IT", 0.95), ("Язык Программирование", 0.04), ("Программирование", 0.01)]
+
+
+def make_entry(entry_id, rnd, per_day=15, start=date(2026, 1, 1)):
+    title = " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(4, 10))).capitalize()
+    category = rnd.choices([c for c, _ in CATEGORIES], [w for _, w in CATEGORIES])[0]
+    content = " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(20, 80)))
+    day = start + timedelta(days=entry_id // per_day)
+    return {
+        "title": title,
+        "category": category,
+        "content": f"{content}\n\nСсылка на источник: https://example.com/{entry_id}",
+        "date": day.isoformat(),
+        "id": entry_id,
+    }
+
+
+def generate(count, seed=42):
+    rnd = random.Random(seed)
+    # Как парсер: ~15 записей в день, но большие наборы укладываются в два года
+    per_day = max(15, count // 730)
+    return [make_entry(i, rnd, per_day) for i in range(1, count + 1)]
+
+
+def write(path, count, seed=42):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(generate(count, seed), f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    cli = argparse.ArgumentParser(description="Генератор синтетического data.json")
+    cli.add_argument("count", type=int, help="сколько записей (2000 ... 1000000)")
+    cli.add_argument("-o", "--output", default="data.json")
+    cli.add_argument("--seed", type=int, default=42)
+    args = cli.parse_args()
+    write(args.output, args.count, args.seed)
+    print(f"Записано {args.count} записей в {args.output}")
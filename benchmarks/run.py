@@ -0,0 +1,240 @@
+# ==========================================
+# Набор офлайн-бенчмарков парсера и приложения
+# Все страницы отдает локальный сервер (benchmarks/server.py), данные
+# генерируются (benchmarks/gen_data.py), результат - плоский JSON
+#
+# Запуск из корня проекта:
+#   python benchmarks/run.py --out results.json
+#   python benchmarks/run.py --sizes 2000,100000,1000000 --out big.json
+#   python benchmarks/run.py --compare results.json   # сравнить с прошлым запуском
+# ==========================================
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(__file__))
+
+import gen_data  # noqa: E402
+from server import start_server  # noqa: E402
+from parser import NewsParser  # noqa: E402
+from search_index import SearchExecutor, SearchIndex  # noqa: E402
+from sources import HackerNewsSource, PythonOrgSource  # noqa: E402
+from storage import EntryStore  # noqa: E402
+
+SEARCH_QUERIES = ["py", "python", "linux kernel", "язык", "безопасность сервер", "zzzz"]
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return (time.perf_counter() - start) * 1000, result
+
+
+@contextlib.contextmanager
+def workdir():
+    """Временная папка: парсер пишет data.json, индексы и кэш в текущую папку"""
+    old = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            yield tmp
+        finally:
+            os.chdir(old)
+
+
+# ------------------------------------------
+# Парсер
+# ------------------------------------------
+def bench_run_all(base_url, repeat):
+    PythonOrgSource.url = base_url + "/blogs/"
+    HackerNewsSource.url = base_url + "/news/"
+    seconds, added = [], []
+    for _ in range(repeat):
+        with workdir():
+            gen_data.write("data.json", 2000)
+            parser = NewsParser(rate_per_host=1000, burst=100, http_cache_dir=None, article_cache_dir=None)
+            before = 2000
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                parser.run_all()
+            seconds.append(time.perf_counter() - start)
+            added.append(len(parser.store.all()) - before)
+            parser.session.close()
+    total = statistics.median(seconds)
+    return {
+        "run_all.seconds": total,
+        "run_all.items": statistics.median(added),
+        "run_all.items_per_sec": statistics.median(added) / total if total else 0,
+    }
+
+
+def bench_article(base_url, repeat):
+    with workdir():
+        parser = NewsParser(rate_per_host=1000, burst=100, http_cache_dir=None, article_cache_dir=None)
+        times = [timed(parser.get_article_content, f"{base_url}/articles/{i}.html")[0] for i in range(repeat)]
+        parser.session.close()
+    return {
+        "article.p50_ms": percentile(times, 0.5),
+        "article.p95_ms": percentile(times, 0.95),
+        "article.mean_ms": statistics.mean(times),
+    }
+
+
+# ------------------------------------------
+# Данные приложения
+# ------------------------------------------
+def bench_store(size):
+    with workdir():
+        gen_data.write("data.json", size)
+        store = EntryStore("data.json", compact_every=10 ** 9)
+        load_ms, _ = timed(store.load)
+        entries = list(store.iter_full())
+        save_ms, _ = timed(store.replace_all, entries)
+        # Повторный запуск: индекс уже построен, тексты с диска не читаются
+        reload_ms, _ = timed(EntryStore("data.json").load)
+        puts = []
+        for i in range(100):
+            entry = dict(entries[i], title=entries[i]['title'] + " (правка)")
+            puts.append(timed(store.put, entry)[0])
+        return {
+            f"store.load_ms.n={size}": load_ms,
+            f"store.reload_ms.n={size}": reload_ms,
+            f"store.save_all_ms.n={size}": save_ms,
+            f"store.put_ms.n={size}": statistics.mean(puts),
+        }, entries, store
+
+
+def bench_search(size, entries, store, repeat):
+    """Поиск так, как его ведет ReferenceApp._perform_search: через SearchExecutor.
+
+    Запрос набирается по букве ("p", "py", "pyt", ...). Если ждать ответа
+    на каждую букву, следующие запросы сужают прошлые результаты; при
+    быстром наборе каждая буква отменяет поиск по предыдущей.
+    """
+    index = SearchIndex()
+    build_ms, _ = timed(index.build, entries)
+    result = {f"search.build_ms.n={size}": build_ms}
+    executor = SearchExecutor(index)
+
+    def submit(text):
+        """Запрос в исполнитель; возвращает событие окончания и время первого ответа, мс"""
+        done = threading.Event()
+        first = []
+        start = time.perf_counter()
+
+        def on_result(ids, finished):
+            # То же, что on_search_results: строки только для записей из хранилища
+            rows = [store.get(entry_id) for entry_id in ids]
+            if not first:
+                first.append((time.perf_counter() - start) * 1000)
+            if finished:
+                done.rows = sum(1 for row in rows if row is not None)
+                done.set()
+
+        executor.submit(text, on_result)
+        return done, first
+
+    keystrokes, first_results, bursts = [], [], []
+    for _ in range(repeat):
+        for query in SEARCH_QUERIES:
+            # Медленный набор: ответ на каждую букву
+            for n in range(1, len(query) + 1):
+                start = time.perf_counter()
+                done, first = submit(query[:n])
+                done.wait()
+                keystrokes.append((time.perf_counter() - start) * 1000)
+                first_results.append(first[0])
+            # Быстрый набор: буквы без ожидания, важен только последний ответ
+            start = time.perf_counter()
+            for n in range(1, len(query) + 1):
+                done, _ = submit(query[:n])
+            done.wait()
+            bursts.append((time.perf_counter() - start) * 1000)
+    result[f"search.keystroke_p50_ms.n={size}"] = percentile(keystrokes, 0.5)
+    result[f"search.keystroke_p95_ms.n={size}"] = percentile(keystrokes, 0.95)
+    result[f"search.first_result_p95_ms.n={size}"] = percentile(first_results, 0.95)
+    result[f"search.burst_typing_ms.n={size}"] = statistics.mean(bursts)
+    return result
+
+
+# ------------------------------------------
+# Запуск и сравнение
+# ------------------------------------------
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(old_path, new):
+    with open(old_path, 'r', encoding='utf-8') as f:
+        old = json.load(f)
+    print(f"Сравнение {old.get('commit')} -> {new.get('commit')}")
+    for name, value in new['metrics'].items():
+        before = old['metrics'].get(name)
+        if before is None:
+            print(f"  {name:40} {value:12.3f}   (новая метрика)")
+            continue
+        change = (value - before) / before * 100 if before else 0.0
+        print(f"  {name:40} {before:12.3f} -> {value:12.3f}  {change:+7.1f}%")
+
+
+def main():
+    cli = argparse.ArgumentParser(description="Офлайн-бенчмарки парсера и приложения")
+    cli.add_argument("--sizes", default="2000,20000", help="размеры синтетического data.json через запятую")
+    cli.add_argument("--repeat", type=int, default=5, help="повторов для каждого замера")
+    cli.add_argument("--delay", type=float, default=0.0, help="искусственная задержка сервера, секунд")
+    cli.add_argument("--out", help="куда сохранить JSON с результатами")
+    cli.add_argument("--compare", help="JSON прошлого запуска для сравнения")
+    args = cli.parse_args()
+
+    server, base_url = start_server(delay=args.delay)
+    metrics = {}
+    try:
+        metrics.update(bench_run_all(base_url, args.repeat))
+        metrics.update(bench_article(base_url, args.repeat * 6))
+    finally:
+        server.shutdown()
+
+    for size in [int(s) for s in args.sizes.split(",") if s]:
+        result, entries, store = bench_store(size)
+        metrics.update(result)
+        metrics.update(bench_search(size, entries, store, args.repeat))
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "metrics": metrics,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text)
+    if args.compare:
+        compare(args.compare, report)
+    elif not args.out:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
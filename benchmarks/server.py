@@ -0,0 +1,86 @@
+# ==========================================
+# Локальная замена python.org и Hacker News для бенчмарков
+# Отдает сохраненные страницы из fixtures/, сеть не нужна
+# ==========================================
+import os
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# Ссылки на статьи в сохраненной странице блога ведут на blogspot - подменяем на локальные
+ARTICLE_HOST = "https://pyfound.blogspot.com/2026/08/"
+
+ROUTES = {
+    "/blogs/": "python_org_blogs.html",
+    "/news/": "hacker_news.html",
+}
+
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    """Отдает страницу из fixtures по пути; любая /articles/... - это article.html.
+
+    Остальные пути, если задан static_dir, - файлы из этой папки как есть
+    (например, manifest.json и шарды, опубликованные parser.py).
+    """
+
+    base_url = ""
+    delay = 0.0
+    static_dir = None
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        name = ROUTES.get(path)
+        if name is None and path.startswith("/articles/"):
+            name = "article.html"
+        if name is None and self.static_dir:
+            self.send_static(path)
+            return
+        if name is None:
+            self.send_error(404)
+            return
+        with open(os.path.join(FIXTURES, name), 'r', encoding='utf-8') as f:
+            body = f.read().replace(ARTICLE_HOST, self.base_url + "/articles/").encode('utf-8')
+        if self.delay:
+            # Имитация задержки сети
+            threading.Event().wait(self.delay)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_static(self, path):
+        file_path = os.path.join(self.static_dir, *path.strip('/').split('/'))
+        if not os.path.isfile(file_path):
+            self.send_error(404)
+            return
+        with open(file_path, 'rb') as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(port=0, delay=0.0, static_dir=None):
+    """Запускает сервер в фоновом потоке, возвращает (server, base_url)"""
+    handler = type("Handler", (FixtureHandler,), {"delay": delay, "static_dir": static_dir})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    handler.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, handler.base_url
+
+
+if __name__ == "__main__":
+    server, url = start_server(8000)
+    print(f"Сервер запущен: {url}/blogs/  {url}/news/  {url}/articles/<любое имя>")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,130 @@
+# ==========================================
+# Индекс дубликатов для парсера
+# Канонические URL и отпечатки заголовков уже известных статей
+# ==========================================
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+from persist import atomic_write_json
+
+# Ссылка на первоисточник, которую парсер дописывает в конец content
+SOURCE_LINK_RE = re.compile(r'(?:Полный источник|Ссылка на источник): (\S+)')
+# Относительные ссылки в старых записях встречаются только у Hacker News (item?id=...)
+DEFAULT_BASE_URL = "https://news.ycombinator.com/"
+
+# Параметры, которые не меняют саму страницу (метки рекламных кампаний и т.п.)
+TRACKING_PARAMS = {"fbclid", "gclid", "yclid", "ref", "ref_src", "source", "mc_cid", "mc_eid"}
+# Пометки, которые HN добавляет к повторным публикациям: "(2019)", "[pdf]", "[video]"
+TITLE_NOISE_RE = re.compile(r'\((?:\d{4})\)|\[(?:pdf|video|audio)\]', re.IGNORECASE)
+NON_WORD_RE = re.compile(r'[\W_]+')
+
+
+def canonical_url(url, base=DEFAULT_BASE_URL):
+    """Приводит URL к одному виду: схема https, хост без www, без меток и якоря"""
+    url = urljoin(base, url.strip())
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    path = re.sub(r'/{2,}', '/', parts.path) or "/"
+    if len(path) > 1:
+        path = path.rstrip('/')
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    )
+    scheme = "https" if parts.scheme in ("http", "https") else parts.scheme
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+def title_fingerprint(title):
+    """Отпечаток заголовка: без регистра, пунктуации, пометок HN и порядка слов"""
+    text = unicodedata.normalize("NFKC", title).casefold()
+    text = TITLE_NOISE_RE.sub(" ", text)
+    words = sorted(set(NON_WORD_RE.sub(" ", text).split()))
+    return " ".join(words)
+
+
+def entry_url(entry):
+    """Ссылка на первоисточник записи (берется из конца content)"""
+    match = SOURCE_LINK_RE.search(entry.get('content', ''))
+    return match.group(1) if match else None
+
+
+def _digest(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+class DedupIndex:
+    """Постоянный индекс уже известных статей.
+
+    Хранит хэши канонических URL и отпечатков заголовков в наборах (set),
+    так что проверка "уже есть?" стоит O(1) и делается до скачивания статьи.
+    Файл индекса обновляется по мере добавления записей, а записи, появившиеся
+    в хранилище в обход парсера, доиндексируются по last_id.
+    """
+
+    def __init__(self, path="dedup_index.json"):
+        self.path = path
+        self.urls = set()
+        self.titles = set()
+        self.last_id = 0
+        self.dirty = False
+
+    def load(self, entries=(), full=None):
+        """Загружает индекс с диска и доиндексирует записи новее last_id.
+
+        Если в entries записи без content (EntryStore.all()), full(id)
+        достает запись целиком - только для тех, что надо доиндексировать.
+        """
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.urls = set(data.get('urls', []))
+                self.titles = set(data.get('titles', []))
+                self.last_id = data.get('last_id', 0)
+            except (OSError, ValueError):
+                self.urls, self.titles, self.last_id = set(), set(), 0
+        for entry in entries:
+            if entry.get('id', 0) > self.last_id:
+                self.add_entry(full(entry['id']) if full else entry)
+        return self
+
+    def seen(self, url=None, title=None):
+        if url and _digest(canonical_url(url)) in self.urls:
+            return True
+        if title and _digest(title_fingerprint(title)) in self.titles:
+            return True
+        return False
+
+    def add(self, url=None, title=None):
+        if url:
+            self.urls.add(_digest(canonical_url(url)))
+        if title:
+            self.titles.add(_digest(title_fingerprint(title)))
+        self.dirty = True
+
+    def add_entry(self, entry):
+        self.add(entry_url(entry), entry.get('title'))
+        self.last_id = max(self.last_id, entry.get('id', 0))
+
+    def seen_entry(self, entry):
+        return self.seen(entry_url(entry), entry.get('title'))
+
+    def save(self):
+        if not self.dirty:
+            return
+        data = {
+            "last_id": self.last_id,
+            "urls": sorted(self.urls),
+            "titles": sorted(self.titles),
+        }
+        atomic_write_json(self.path, data, ensure_ascii=True)
+        self.dirty = False
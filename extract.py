@@ -0,0 +1,215 @@
+# ==========================================
+# Извлечение данных из HTML для парсера
+# Разбирается только нужная часть страницы, селекторы компилируются один раз
+# ==========================================
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup, SoupStrainer
+import soupsieve
+
+# lxml заметно быстрее встроенного html.parser, но он необязателен
+try:
+    import lxml  # noqa: F401
+    DEFAULT_BACKEND = "lxml"
+except ImportError:
+    DEFAULT_BACKEND = "html.parser"
+
+
+class Extractor:
+    """Частичный разбор страницы.
+
+    strainer оставляет в дереве только нужные поддеревья (остальная страница
+    токенизируется, но не превращается в объекты), а selector заранее
+    скомпилирован через soupsieve и не разбирается заново на каждой странице.
+    """
+
+    def __init__(self, strainer, selector, backend=None):
+        self.strainer = strainer
+        self.selector = soupsieve.compile(selector)
+        self.backend = backend or DEFAULT_BACKEND
+
+    def soup(self, html):
+        return BeautifulSoup(html, self.backend, parse_only=self.strainer)
+
+    def select(self, html):
+        return self.selector.select(self.soup(html))
+
+
+def has_class(name):
+    """Фильтр атрибута class для SoupStrainer.
+
+    Во время разбора strainer видит class целой строкой ("list-recent-posts menu"),
+    поэтому обычное class_='list-recent-posts' не срабатывает на составных классах.
+    """
+    def match(value):
+        if not value:
+            return False
+        classes = value.split() if isinstance(value, str) else value
+        return name in classes
+    return match
+
+
+# Список статей блога Python.org: <ul class="list-recent-posts"><li>...
+PYTHON_ORG_LISTING = Extractor(SoupStrainer('ul', class_=has_class('list-recent-posts')), 'ul.list-recent-posts > li')
+# Строки главной Hacker News: <tr class="athing"> ... <span class="titleline"><a>
+HN_LISTING = Extractor(SoupStrainer('tr', class_=has_class('athing')), 'tr.athing span.titleline > a')
+# Основной текст статьи: все <p> внутри div/section.main-content
+ARTICLE_BODY = Extractor(SoupStrainer(['div', 'section'], class_=has_class('main-content')), '.main-content p')
+
+_LINK = soupsieve.compile('a')
+_TIME = soupsieve.compile('time')
+
+
+def extract_python_org_listing(html, extractor=PYTHON_ORG_LISTING):
+    """Строки блога Python.org: title, href и дата публикации"""
+    rows = []
+    for li in extractor.select(html):
+        link_tag = _LINK.select_one(li)
+        time_tag = _TIME.select_one(li)
+        if link_tag is None or time_tag is None:
+            continue
+        rows.append({
+            "title": link_tag.text,
+            "href": link_tag.get('href', ''),
+            "date": time_tag.get('datetime', '')[:10],
+        })
+    return rows
+
+
+def extract_hn_listing(html, extractor=HN_LISTING):
+    """Строки главной Hacker News: title и href"""
+    return [{"title": a.text, "href": a.get('href', '')} for a in extractor.select(html)]
+
+
+def extract_article(html, max_paragraphs=3, min_length=40, extractor=ARTICLE_BODY):
+    """Первые содержательные абзацы статьи.
+
+    Возвращает None, если на странице нет блока main-content, и список
+    абзацев (возможно, пустой) в остальных случаях.
+    """
+    soup = extractor.soup(html)
+    if soup.find(class_='main-content') is None:
+        return None
+    text_parts = []
+    for p in extractor.selector.select(soup):
+        text = p.text.strip()
+        if len(text) > min_length:  # Игнорируем слишком короткие строки (даты, подписи)
+            text_parts.append(text)
+            if max_paragraphs and len(text_parts) >= max_paragraphs:
+                break
+    return text_parts
+
+
+# Разборщики по имени: их можно вызвать в процессе-исполнителе через extract_bytes
+EXTRACTORS = {
+    "article": extract_article,
+    "python_org": extract_python_org_listing,
+    "hacker_news": extract_hn_listing,
+}
+
+
+def extract_bytes(kind, data, encoding=None, **kwargs):
+    """Сырые байты страницы -> небольшой результат разбора (строки списка или абзацы).
+
+    Точка входа для ProcessPoolExecutor: туда передаются только байты и
+    имя разборщика, обратно - списки строк, а не дерево страницы.
+    """
+    try:
+        html = data.decode(encoding or 'utf-8', errors='replace')
+    except LookupError:
+        html = data.decode('utf-8', errors='replace')
+    return EXTRACTORS[kind](html, **kwargs)
+
+
+class ArticleStream(HTMLParser):
+    """Потоковое извлечение абзацев статьи - то же, что extract_article с lxml.
+
+    Страницу можно подавать в feed() кусками по мере скачивания: done
+    становится True, как только набрано max_paragraphs абзацев, и остаток
+    страницы можно не качать. Дерево не строится, запоминается только
+    вложенность блока main-content и текст текущего <p>.
+
+    Абзац заканчивается там же, где его закрывает lxml: на </p>, на
+    следующем <p>, на блочных тегах из P_CLOSERS (текст после вложенного
+    <div> уже не в абзаце) и на конце блока вокруг абзаца. Текст <script> и <style> в абзац не попадает.
+    С бэкендом html.parser extract_article абзацы блочными тегами не
+    закрывает, и результаты на такой разметке расходятся.
+    """
+
+    BLOCK_TAGS = ('div', 'section')
+    # Теги, начало которых закрывает открытый <p> в HTML-парсере libxml2 (lxml)
+    P_CLOSERS = frozenset((
+        'p', 'div', 'address', 'blockquote', 'center', 'dir', 'dl', 'dd', 'dt', 'fieldset', 'form',
+        'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'li', 'listing', 'menu', 'ol', 'pre', 'ul', 'xmp',
+        'table', 'caption', 'colgroup', 'tbody', 'tfoot', 'tr', 'td', 'th',
+    ))
+    # Их содержимое - код, а не текст (в дереве это Script/Stylesheet, .text их пропускает)
+    RAW_TAGS = ('script', 'style')
+
+    def __init__(self, max_paragraphs=3, min_length=40):
+        super().__init__(convert_charrefs=True)
+        self.max_paragraphs = max_paragraphs
+        self.min_length = min_length
+        self.found = False      # встречался ли блок main-content
+        self.paragraphs = []
+        self.done = False
+        self._block = None      # тег блока main-content, внутри которого мы сейчас
+        self._depth = 0         # вложенность одноименных тегов внутри блока
+        self._text = None       # куски текста текущего <p>
+        self._p_depth = 0       # вложенность блока, в котором открыт текущий <p>
+        self._raw = None        # <script>/<style>, внутри которого мы сейчас
+
+    def handle_starttag(self, tag, attrs):
+        if self._block is None:
+            if tag in self.BLOCK_TAGS and 'main-content' in (dict(attrs).get('class') or '').split():
+                self.found = True
+                self._block = tag
+                self._depth = 1
+            return
+        if tag in self.P_CLOSERS:
+            # Незакрытый <p> закрывается следующим <p> или блоком, как при разборе в дерево
+            self._end_paragraph()
+        if tag == self._block:
+            self._depth += 1
+        elif tag == 'p':
+            self._text = []
+            self._p_depth = self._depth
+        elif tag in self.RAW_TAGS:
+            self._raw = tag
+
+    def handle_endtag(self, tag):
+        if self._block is None:
+            return
+        if tag == self._raw:
+            self._raw = None
+            return
+        if tag in self.P_CLOSERS:
+            # Такие блоки закрывают <p>, так что это </p> или конец блока вокруг абзаца
+            self._end_paragraph()
+        if tag == self._block:
+            self._depth -= 1
+            if self._depth < self._p_depth:
+                # <section> внутри абзаца его не закрывает, а конец <section> вокруг - закрывает
+                self._end_paragraph()
+            if self._depth == 0:
+                self._block = None
+
+    def handle_data(self, data):
+        if self._text is not None and self._raw is None:
+            self._text.append(data)
+
+    def _end_paragraph(self):
+        if self._text is None:
+            return
+        text = "".join(self._text).strip()
+        self._text = None
+        if self.done or len(text) <= self.min_length:
+            return
+        self.paragraphs.append(text)
+        if self.max_paragraphs and len(self.paragraphs) >= self.max_paragraphs:
+            self.done = True
+
+    def result(self):
+        """Как у extract_article: None без блока main-content, иначе список абзацев"""
+        self._end_paragraph()
+        return self.paragraphs if self.found else None
@@ -0,0 +1,88 @@
+# ==========================================
+# Фасет по категориям: категория -> id записей и их количество
+# Обновляется по одной записи, поэтому меню категорий и фильтр
+# не пересчитывают весь справочник
+# ==========================================
+from itertools import chain
+
+
+class CategoryFacets:
+    """Списки id записей по категориям.
+
+    Для каждой категории хранится упорядоченное множество id (dict без
+    значений), поэтому добавление, удаление и смена категории стоят O(1),
+    список категорий с количеством - O(числа категорий), а записи одной
+    категории - O(размера результата).
+
+    Записи старше всех остальных (месяцы, подгруженные из архива) ложатся
+    через add_older отдельными сегментами перед списком категории, так что
+    существующие списки при этом не копируются.
+    """
+
+    def __init__(self):
+        self.ids = {}          # категория -> {id: None} в порядке добавления
+        self.older = {}        # категория -> [{id: None}] более старых записей, от старых к новым
+        self.category_of = {}  # id -> категория
+
+    def build(self, entries):
+        self.ids = {}
+        self.older = {}
+        self.category_of = {}
+        for entry in entries:
+            self.add(entry['id'], entry['category'])
+
+    def add(self, entry_id, category):
+        self.ids.setdefault(category, {})[entry_id] = None
+        self.category_of[entry_id] = category
+
+    def add_older(self, entries):
+        """Записи старше уже добавленных (по порядку): встают в начало своих категорий"""
+        groups = {}
+        for entry in entries:
+            groups.setdefault(entry['category'], {})[entry['id']] = None
+            self.category_of[entry['id']] = entry['category']
+        for category, ids in groups.items():
+            self.older.setdefault(category, []).insert(0, ids)
+
+    def remove(self, entry_id):
+        category = self.category_of.pop(entry_id, None)
+        if category is None:
+            return
+        ids = self.ids.get(category)
+        if ids is not None and entry_id in ids:
+            del ids[entry_id]
+            if not ids:
+                del self.ids[category]
+            return
+        segments = self.older[category]
+        for ids in segments:
+            if entry_id in ids:
+                del ids[entry_id]
+                if not ids:
+                    segments.remove(ids)
+                break
+        if not segments:
+            del self.older[category]
+
+    def update(self, entry_id, category):
+        if self.category_of.get(entry_id) == category:
+            return
+        self.remove(entry_id)
+        self.add(entry_id, category)
+
+    def counts(self):
+        """[(категория, число записей)] по алфавиту"""
+        return sorted(
+            (category, len(self.ids.get(category, ())) + sum(map(len, self.older.get(category, ()))))
+            for category in self.ids.keys() | self.older.keys()
+        )
+
+    def entries_in(self, category):
+        """id записей категории от старых к новым"""
+        segments = self.older.get(category)
+        if not segments:
+            return self.ids.get(category, {}).keys()
+        return list(chain(*segments, self.ids.get(category, ())))
+
+    def __len__(self):
+        return len(self.category_of)
@@ -1,25 +1,123 @@
 # ==========================================
 # Импорт необходимых библиотек и модулей
 # ==========================================
+import os
+import time
+
+# Замер запуска: PROFILE_STARTUP=1 python main.py - печатает время до первого
+# кадра и сохраняет startup_report.json и профиль startup.prof
+_STARTED = time.perf_counter()
+PROFILE_STARTUP = bool(os.environ.get("PROFILE_STARTUP"))
+if PROFILE_STARTUP:
+    import cProfile
+    _startup_profiler = cProfile.Profile()
+    _startup_profiler.enable()
+
+# Здесь только то, что нужно для главного экрана. Диалоги, меню и виджеты
+# экранов деталей и редактирования импортируются при первом использовании
 from kivymd.app import MDApp
 from kivymd.uix.screen import MDScreen
 from kivymd.uix.screenmanager import MDScreenManager
-from kivymd.uix.list import MDList, TwoLineAvatarIconListItem, IconLeftWidget
+from kivymd.uix.list import TwoLineAvatarIconListItem, IconLeftWidget
 from kivymd.uix.toolbar import MDTopAppBar
 from kivymd.uix.button import MDFloatingActionButton, MDIconButton
-from kivymd.uix.dialog import MDDialog
 from kivymd.uix.textfield import MDTextField
-from kivymd.uix.button import MDRaisedButton, MDFlatButton
 from kivymd.uix.boxlayout import MDBoxLayout
-from kivymd.uix.scrollview import MDScrollView
-from kivymd.uix.label import MDLabel
-from kivymd.uix.menu import MDDropdownMenu
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+from kivy.properties import NumericProperty
 from kivy.metrics import dp
-from kivy.network.urlrequest import UrlRequest
 from kivy.clock import Clock
 import json
-import os
+import threading
+from array import array
+from bisect import bisect_left, insort
 from datetime import datetime
+from itertools import chain, islice
+
+from facets import CategoryFacets
+from persist import WriteBehind, atomic_write_json
+from search_index import SearchExecutor, SearchIndex
+from storage import EntryStore
+from sync import DeltaSyncClient
+
+# Откуда приложение берет обновления (manifest.json и шарды публикует parser.py)
+SYNC_BASE_URL = "https://raw.githubusercontent.com/igris2212/project-on-college/refs/heads/main/"
+
+# Сколько текстов записей доиндексировать для поиска за один кадр
+CONTENT_INDEX_BATCH = 200
+# Сколько строк списка показать сразу из начала индекса, до полной загрузки
+FIRST_PAGE_SIZE = 20
+# Текст записи на экране деталей: куски по столько символов, каждый - свой MDLabel
+# (одна текстура на всю длинную статью слишком велика); сначала создаются первые
+# DETAIL_FIRST_CHUNKS, остальные - по мере прокрутки (и пока текст не заполнил экран)
+DETAIL_CHUNK_CHARS = 2000
+DETAIL_FIRST_CHUNKS = 2
+# Сколько последних месяцев держать в хранилище, старые - в архиве (подгружаются по требованию)
+ARCHIVE_KEEP_MONTHS = 6
+
+
+def split_text(text, size):
+    """Делит текст на куски не длиннее size символов по границам абзацев.
+
+    Абзац длиннее size режется по последнему пробелу перед границей.
+    """
+    chunk = ""
+    for paragraph in text.split("\n\n"):
+        while len(paragraph) > size:
+            cut = paragraph.rfind(" ", 0, size)
+            if cut <= 0:
+                cut = size
+            if chunk:
+                yield chunk
+                chunk = ""
+            yield paragraph[:cut]
+            paragraph = paragraph[cut:].lstrip()
+        if chunk and len(chunk) + 2 + len(paragraph) > size:
+            yield chunk
+            chunk = paragraph
+        else:
+            chunk = chunk + "\n\n" + paragraph if chunk else paragraph
+    if chunk:
+        yield chunk
+
+
+class RowIndex:
+    """Номер строки списка по id записи, без поиска по массиву id.
+
+    Каждая строка получает ключ: строка, вставленная сверху, - на единицу
+    меньше первого, добавленная снизу - следующий за последним. Номер
+    строки - это ее ключ минус ключ первой строки и минус число удаленных
+    строк выше нее (удаленные ключи хранятся отсортированными). Так вставка
+    сверху и снизу стоит O(1), а поиск и удаление - O(log числа удалений);
+    reset() при полной пересборке списка все обнуляет.
+    """
+
+    def __init__(self):
+        self.reset(())
+
+    def reset(self, ids):
+        self._keys = {entry_id: key for key, entry_id in enumerate(ids)}
+        self._first = 0
+        self._next = len(self._keys)
+        self._removed = []
+
+    def row(self, entry_id):
+        key = self._keys.get(entry_id)
+        if key is None:
+            return None
+        return key - self._first - bisect_left(self._removed, key)
+
+    def insert_top(self, entry_id):
+        self._first -= 1
+        self._keys[entry_id] = self._first
+
+    def append(self, entry_id):
+        self._keys[entry_id] = self._next
+        self._next += 1
+
+    def remove(self, entry_id):
+        insort(self._removed, self._keys.pop(entry_id))
 
 
 # ==========================================
@@ -40,6 +138,22 @@ class AddEditScreen(MDScreen):
     """Экран добавления/редактирования записи"""
     pass
 
+
+class EntryListItem(TwoLineAvatarIconListItem):
+    """Строка списка записей.
+
+    RecycleView создает столько строк, сколько помещается на экране, и при
+    прокрутке переиспользует их, подставляя text/secondary_text/entry_id.
+    """
+    entry_id = NumericProperty(0)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.add_widget(IconLeftWidget(icon="book-open-variant"))
+
+    def on_release(self):
+        MDApp.get_running_app().open_detail_by_id(self.entry_id)
+
 # ==========================================
 # Главный класс приложения (Controller + Model)
 # Отвечает за логику, хранение данных и создание интерфейса
@@ -48,12 +162,40 @@ class ReferenceApp(MDApp):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.data_file = "data.json"
+        # Изменения записей дописываются в журнал, data.json переписывается только при сжатии
+        # Все записи на диск (журнал, настройки, состояние синхронизации) идут
+        # через фоновый поток; о результате он сообщает в главный поток через Clock
+        self.writer = WriteBehind(dispatch=lambda func: Clock.schedule_once(lambda dt: func()))
+        self.store = EntryStore(self.data_file, writer=self.writer)
         self.settings_file = "settings.json"
-        self.entries = []
-        self.filtered_entries = []
+        # Записи лежат в store.entries (id -> Entry), а отфильтрованный список -
+        # это массив id в порядке показа, без копий самих записей
+        self.filtered_ids = array('q')
+        # id -> номер строки в filtered_ids, чтобы правка одной записи не искала ее в массиве
+        self.row_index = RowIndex()
+        # Инвертированный индекс для поиска по названию и содержанию
+        self.search_index = SearchIndex()
+        # Поиск идет в своем потоке порциями; результаты приходят в главный поток через Clock
+        self.search_executor = SearchExecutor(
+            self.search_index, dispatch=lambda func: Clock.schedule_once(lambda dt: func())
+        )
+        self._search_event = None
+        self._content_queue = iter(())
+        # Категория -> id записей, для меню категорий и фильтра
+        self.facets = CategoryFacets()
+        # Дельта-синхронизация: помнит версии шардов и локальные правки
+        self.sync_client = DeltaSyncClient(SYNC_BASE_URL, writer=self.writer)
         self.current_entry = None
         self.current_category = "Все"
         self.dialog = None
+        self._paging = False  # идет подгрузка месяцев из архива
+        self._search_months = []  # месяцы архива, подгруженные для поиска (выгружаются, когда запрос стерт)
+        self._syncing = False  # идет синхронизация (загрузка, слияние, архивация)
+        self._detail_chunks = iter(())  # еще не показанные куски текста открытой записи
+        # Записи загружаются в фоне; до этого список показывает первую страницу
+        self.data_ready = False
+        self.startup_marks = {}
+        self.mark_startup("imports")
         
     def build(self):
         self.theme_cls.primary_palette = "Blue"
@@ -62,25 +204,44 @@ class ReferenceApp(MDApp):
         settings = self.load_settings()
         self.theme_cls.theme_style = settings.get("theme", "Light")
         
-        # Загружаем данные
-        self.load_data()
-        
-        # Создаем менеджер экранов
+        # Создаем менеджер экранов. Сразу строится только главный экран,
+        # экраны деталей и редактирования - при первом переходе на них
         sm = MDScreenManager()
+        sm.add_widget(self.build_main_screen())
         
-        # Главный экран
-        main_screen = self.build_main_screen()
-        sm.add_widget(main_screen)
-        
-        # Экран деталей
-        detail_screen = self.build_detail_screen()
-        sm.add_widget(detail_screen)
-        
-        # Экран добавления/редактирования
-        add_edit_screen = self.build_add_edit_screen()
-        sm.add_widget(add_edit_screen)
+        # Первая страница списка читается из начала индекса, остальное - в фоне
+        self.entries_list.data = [self._row_data(e) for e in self.store.peek(FIRST_PAGE_SIZE)]
+        threading.Thread(target=self._load_worker, daemon=True).start()
         
+        self.mark_startup("build")
         return sm
+
+    def on_start(self):
+        if PROFILE_STARTUP:
+            from kivy.core.window import Window
+            Window.bind(on_flip=self._on_first_frame)
+
+    def _on_first_frame(self, window):
+        window.unbind(on_flip=self._on_first_frame)
+        self.mark_startup("first_frame")
+
+    def mark_startup(self, name):
+        """Отметка времени от запуска процесса (только в режиме PROFILE_STARTUP)"""
+        if not PROFILE_STARTUP or name in self.startup_marks:
+            return
+        self.startup_marks[name] = round((time.perf_counter() - _STARTED) * 1000, 1)
+        print(f"STARTUP: {name} - {self.startup_marks[name]} мс")
+        if name == "first_frame":
+            _startup_profiler.disable()
+            _startup_profiler.dump_stats("startup.prof")
+        marks = dict(self.startup_marks)
+        self.writer.schedule("startup_report.json", lambda: atomic_write_json("startup_report.json", marks, indent=2))
+
+    def _ensure_screen(self, name):
+        """Строит экран деталей или редактирования при первом переходе на него"""
+        if not self.root.has_screen(name):
+            build_screen = {'detail': self.build_detail_screen, 'add_edit': self.build_add_edit_screen}[name]
+            self.root.add_widget(build_screen())
     
     # ------------------------------------------
     # Методы построения интерфейса (UI Building)
@@ -119,20 +280,34 @@ class ReferenceApp(MDApp):
         )
         self.search_field.bind(text=self.on_search_text)
         
+        # Кнопка поиска ищет и по архиву: подгружает все его месяцы
         search_btn = MDIconButton(
             icon="magnify",
-            size_hint_x=0.15
+            size_hint_x=0.15,
+            on_release=lambda x: self.search_archive()
         )
         
         search_layout.add_widget(self.search_field)
         search_layout.add_widget(search_btn)
         layout.add_widget(search_layout)
         
-        # Список записей
-        scroll = MDScrollView()
-        self.entries_list = MDList()
-        scroll.add_widget(self.entries_list)
-        layout.add_widget(scroll)
+        # Список записей (новые сверху): рисуются только видимые строки, виджеты
+        # переиспользуются; у нижнего края (или если список короче экрана)
+        # подгружается следующий месяц из архива
+        self.entries_list = RecycleView(viewclass=EntryListItem)
+        self.entries_list.bind(scroll_y=self.on_list_scroll)
+        rows_layout = RecycleBoxLayout(
+            orientation='vertical',
+            default_size=(None, dp(72)),
+            default_size_hint=(1, None),
+            size_hint_y=None
+        )
+        rows_layout.bind(minimum_height=rows_layout.setter('height'))
+        rows_layout.bind(height=self._schedule_list_fill)
+        self.entries_list.bind(height=self._schedule_list_fill)
+        self.entries_list.add_widget(rows_layout)
+        self.rows_layout = rows_layout
+        layout.add_widget(self.entries_list)
         
         # Кнопка добавления
         fab = MDFloatingActionButton(
@@ -151,6 +326,9 @@ class ReferenceApp(MDApp):
     
     def build_detail_screen(self):
         """Создание экрана деталей"""
+        from kivymd.uix.label import MDLabel
+        from kivymd.uix.scrollview import MDScrollView
+        
         screen = DetailScreen(name='detail')
         
         layout = MDBoxLayout(orientation='vertical')
@@ -198,12 +376,13 @@ class ReferenceApp(MDApp):
             height=dp(20)
         )
         
-        self.detail_content = MDLabel(
-            text="",
-            font_style="Body1",
+        # Куски текста добавляются сюда в show_detail_text
+        self.detail_content = MDBoxLayout(
+            orientation='vertical',
+            spacing=dp(16),
             size_hint_y=None
         )
-        self.detail_content.bind(texture_size=self.detail_content.setter('size'))
+        self.detail_content.bind(minimum_height=self.detail_content.setter('height'))
         
         content_layout.add_widget(self.detail_title)
         content_layout.add_widget(self.detail_category)
@@ -212,6 +391,13 @@ class ReferenceApp(MDApp):
         content_layout.add_widget(self.detail_content)
         
         scroll.add_widget(content_layout)
+        scroll.bind(scroll_y=self.on_detail_scroll)
+        # Короткий текст или большой экран: прокрутки нет, и следующие куски
+        # добавляются, пока текст не станет выше экрана
+        content_layout.bind(height=self._schedule_detail_fill)
+        scroll.bind(height=self._schedule_detail_fill)
+        self.detail_scroll = scroll
+        self.detail_layout = content_layout
         layout.add_widget(scroll)
         
         screen.add_widget(layout)
@@ -219,6 +405,9 @@ class ReferenceApp(MDApp):
     
     def build_add_edit_screen(self):
         """Создание экрана добавления/редактирования"""
+        from kivymd.uix.button import MDRaisedButton
+        from kivymd.uix.scrollview import MDScrollView
+        
         screen = AddEditScreen(name='add_edit')
         
         layout = MDBoxLayout(orientation='vertical')
@@ -282,17 +471,32 @@ class ReferenceApp(MDApp):
     # Работа с данными (Data Layer)
     # Загрузка и сохранение в JSON файл
     # ------------------------------------------
+    def _load_worker(self):
+        """Фоновая загрузка: главный поток в это время рисует первый кадр"""
+        try:
+            self.load_data()
+            # Список месяцев архива кэшируется - читаем папку здесь, а не при первой прокрутке
+            self.store.archive_months()
+        except Exception as e:
+            print(f"DEBUG: Ошибка загрузки данных: {e}")
+        Clock.schedule_once(lambda dt: self.on_data_loaded())
+
     def load_data(self):
-        """Загрузка данных из JSON"""
-        if os.path.exists(self.data_file):
+        """Загрузка данных из хранилища (индекс записей + журнал изменений).
+
+        В памяти только id/title/category/date, текст записи читается с диска
+        при открытии (store.content). Вызывается в фоновом потоке: индекс
+        поиска по названиям и фасет категорий строятся здесь же, до того как
+        интерфейс начнет ими пользоваться.
+        """
+        if self.store.exists():
             try:
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    self.entries = json.load(f)
+                self.store.load()
             except:
-                self.entries = []
+                self.store.entries = {}
         else:
             # Создаем примеры данных
-            self.entries = [
+            samples = [
                 {
                     "id": 1,
                     "title": "Python",
@@ -315,58 +519,103 @@ class ReferenceApp(MDApp):
                     "date": "2026-01-19"
                 }
             ]
-            self.save_data()
+            self.store.replace_all(samples)
         
-        self.filtered_entries = self.entries.copy()
-    
-    def save_data(self):
-        """Сохранение данных в JSON"""
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump(self.entries, f, ensure_ascii=False, indent=2)
+        # Индекс поиска сначала только по названиям, тексты доиндексируются порциями
+        self.search_index.build(self.store.entries.values())
+        self.facets.build(self.store.entries.values())
 
+    def on_data_loaded(self):
+        """Данные загружены: показываем весь список (с учетом уже введенного поиска)"""
+        self.data_ready = True
+        self._perform_search(self.search_field.text)
+        self.mark_startup("data_loaded")
+        self._content_queue = iter(list(self.store.entries))
+        Clock.unschedule(self._index_content)
+        Clock.schedule_once(self._index_content, 0)
+
+    def _index_content(self, dt):
+        """Одна порция текстов для поиска; следующая - в следующем кадре"""
+        batch = list(islice(self._content_queue, CONTENT_INDEX_BATCH))
+        for entry_id in batch:
+            if self.store.get(entry_id) is not None:
+                self.search_index.add_content(entry_id, self.store.content(entry_id))
+        if batch:
+            Clock.schedule_once(self._index_content, 0)
+        else:
+            self.mark_startup("search_ready")
+    
     def sync_with_github(self):
-        """Синхронизация данных с GitHub"""
-        url = "https://raw.githubusercontent.com/igris2212/project-on-college/refs/heads/main/data.json"
-        
+        """Синхронизация данных с GitHub (скачиваются только изменившиеся шарды)"""
+        if not self.data_ready or self._syncing:
+            return
+        self._syncing = True
         # Показываем уведомление о начале загрузки
         self.show_alert("Синхронизация", "Загрузка обновлений из интернета...")
         
-        # Добавляем заголовки, чтобы GitHub нас не блокировал
-        headers = {'User-Agent': 'KivyMD-App'}
-        
-        # Выполняем запрос
-        UrlRequest(
-            url, 
-            on_success=self.on_sync_success,
-            on_failure=self.on_sync_error,
-            on_error=self.on_sync_error,
-            req_headers=headers
+        # Сеть и разбор JSON - в фоновом потоке, чтобы не подвешивать интерфейс
+        threading.Thread(target=self._sync_worker, daemon=True).start()
+
+    def _sync_worker(self):
+        """Фоновая синхронизация: загрузка шардов, слияние и архивация.
+
+        Слияние читает тексты записей (mmap, zlib) и пишет журнал, архивация
+        переписывает data.json, индекс и файлы архива - все это не в главном
+        потоке. В главный поток возвращаются только счетчики и id записей.
+        """
+        try:
+            changes = self.sync_client.fetch_changes()
+        except Exception as e:
+            Clock.schedule_once(lambda dt, error=e: self.on_sync_error(error))
+            return
+        # Слияние скачанных изменений с локальными (локальные правки не теряются)
+        try:
+            stats = self.sync_client.merge(self.store, changes)
+        except Exception as e:
+            print(f"DEBUG: Ошибка слияния: {e}")
+            Clock.schedule_once(lambda dt: self.on_sync_error(None))
+            return
+        # Записи старых месяцев, пришедшие с сервера, уходят в архив
+        try:
+            moved = self.store.archive_old(ARCHIVE_KEEP_MONTHS)
+        except Exception as e:
+            print(f"DEBUG: Ошибка архивации: {e}")
+            moved = []
+        Clock.schedule_once(lambda dt: self.on_sync_success(stats, moved))
+
+    def on_sync_success(self, stats, moved):
+        """Слияние и архивация закончены: индексы обновляются только по затронутым записям"""
+        self._syncing = False
+        # Архивация выгружает и подгруженные месяцы - их больше нечего выгружать
+        self._search_months = [month for month in self._search_months if month in self.store.paged_months]
+        changed = []
+        for entry_id in set(stats['changed_ids']).union(moved):
+            entry = self.store.get(entry_id)
+            if entry is None:
+                self.search_index.remove(entry_id)
+                self.facets.remove(entry_id)
+            else:
+                # Как при запуске: сразу названия, тексты - порциями в следующих кадрах
+                self.search_index.update(entry)
+                self.facets.update(entry_id, entry.category)
+                changed.append(entry_id)
+        self._content_queue = chain(self._content_queue, changed)
+        Clock.unschedule(self._index_content)
+        Clock.schedule_once(self._index_content, 0)
+        self._perform_search(self.search_field.text)
+        self.show_alert(
+            "Готово",
+            f"Синхронизация завершена! Обновлено: {stats['updated']}, удалено: {stats['deleted']}. "
+            f"Всего записей: {len(self.store.entries)}"
         )
 
-    def on_sync_success(self, request, result):
-        """Обработка успешной загрузки"""
-        # Если GitHub вернул строку вместо списка (бывает при некоторых ошибках), попробуем её распарсить
-        if isinstance(result, str):
-            try:
-                result = json.loads(result)
-            except:
-                self.show_alert("Ошибка", "Не удалось прочитать JSON файл")
-                return
-
-        if isinstance(result, list):
-            # Сохраняем скачанные данные
-            self.entries = result
-            self.save_data()
-            self.filtered_entries = self.entries.copy()
-            self.update_entries_list()
-            self.show_alert("Готово", f"Синхронизация завершена! Всего записей: {len(self.entries)}")
-        else:
-            print(f"DEBUG: Получен неожиданный тип данных: {type(result)}")
+    def on_sync_error(self, error):
+        """Обработка ошибки загрузки (error=None - данные скачались, но не слились)"""
+        self._syncing = False
+        if error is None:
             self.show_alert("Ошибка", "Получены данные в неизвестном формате")
-
-    def on_sync_error(self, request, error):
-        """Обработка ошибки загрузки"""
-        self.show_alert("Ошибка", f"Не удалось обновить данные. Проверьте интернет. {error}")
+        else:
+            self.show_alert("Ошибка", f"Не удалось обновить данные. Проверьте интернет. {error}")
 
     # ------------------------------------------
     # Работа с настройками (Settings)
@@ -382,72 +631,215 @@ class ReferenceApp(MDApp):
         return {"theme": "Light"}
 
     def save_settings(self):
-        """Сохранение настроек приложения"""
+        """Сохранение настроек приложения (в фоновом потоке, частые переключения склеиваются)"""
         settings = {"theme": self.theme_cls.theme_style}
-        with open(self.settings_file, 'w', encoding='utf-8') as f:
-            json.dump(settings, f, ensure_ascii=False, indent=2)
+        self.writer.schedule(
+            self.settings_file,
+            lambda: atomic_write_json(self.settings_file, settings, indent=2),
+            callback=self.on_settings_saved,
+        )
+
+    def on_settings_saved(self, error):
+        if error is not None:
+            self.show_alert("Ошибка", f"Не удалось сохранить настройки. {error}")
     
     # ------------------------------------------
     # UI Логика и обновление отображения
     # ------------------------------------------
     def update_entries_list(self):
-        """Обновление списка записей (оптимизировано)"""
-        self.entries_list.clear_widgets()
-        self._load_index = 0
-        self._load_batch(0)
-
-    def _load_batch(self, dt):
-        """Порционная загрузка элементов списка для плавности UI"""
-        batch_size = 20  # Количество элементов за один раз
-        end_index = min(self._load_index + batch_size, len(self.filtered_entries))
-        
-        for i in range(self._load_index, end_index):
-            entry = self.filtered_entries[i]
-            item = TwoLineAvatarIconListItem(
-                text=entry['title'],
-                secondary_text=entry['category'],
-                on_release=lambda x, e=entry: self.open_detail_screen(e)
-            )
-            icon = IconLeftWidget(icon="book-open-variant")
-            item.add_widget(icon)
-            self.entries_list.add_widget(item)
-            
-        self._load_index = end_index
-        # Если остались еще элементы, планируем следующую порцию
-        if self._load_index < len(self.filtered_entries):
-            Clock.schedule_once(self._load_batch, 0.05)
+        """Обновление списка записей: подменяется только источник данных RecycleView"""
+        # Записи меняют и фоновые потоки (слияние, архивация): проверка и чтение - под одной блокировкой
+        with self.store.lock:
+            entries = self.store.entries
+            if any(i not in entries for i in self.filtered_ids):
+                # Записи могли уйти в архив, пока фильтр (фасет, результаты поиска) еще не обновлен
+                self.filtered_ids = array('q', (i for i in self.filtered_ids if i in entries))
+            rows = [self._row_data(entries[i]) for i in self.filtered_ids]
+        self.row_index.reset(self.filtered_ids)
+        self.entries_list.data = rows
+
+    def _row_data(self, entry):
+        return {"text": entry.title, "secondary_text": entry.category, "entry_id": entry.id}
+
+    def _in_current_view(self, entry):
+        """Проходит ли запись текущий фильтр (категория и поисковый запрос).
+
+        Запрос сверяется только со словами этой записи, а не ищется по всему индексу.
+        """
+        if self.current_category != "Все" and entry.category != self.current_category:
+            return False
+        search_text = self.search_field.text.strip()
+        return not search_text or self.search_index.matches(entry.id, search_text)
+
+    def refresh_entry_row(self, entry_id):
+        """Точечно обновляет список после изменения одной записи.
+
+        Строка записи правится, добавляется наверх или убирается - остальные
+        строки RecycleView не пересоздаются.
+        """
+        entry = self.store.get(entry_id)
+        visible = entry is not None and self._in_current_view(entry)
+        row = self.row_index.row(entry_id)
+        if row is not None and visible:
+            self.entries_list.data[row] = self._row_data(entry)
+        elif row is not None:
+            self.row_index.remove(entry_id)
+            del self.filtered_ids[row]
+            del self.entries_list.data[row]
+        elif visible:
+            self.row_index.insert_top(entry_id)
+            self.filtered_ids.insert(0, entry_id)
+            self.entries_list.data.insert(0, self._row_data(entry))
+    
+    def on_list_scroll(self, instance, value):
+        """Долистали до конца списка (или найденного) - подгружаем следующий месяц из архива"""
+        if value <= 0 and self.data_ready:
+            months = self.store.archive_months()
+            if months:
+                self.page_in_archive(months[:1], for_search=bool(self.search_field.text.strip()))
+    
+    def _schedule_list_fill(self, *args):
+        Clock.unschedule(self._fill_list_view)
+        Clock.schedule_once(self._fill_list_view, 0)
+    
+    def _fill_list_view(self, dt):
+        """Список короче экрана (прокрутки нет) - подгружаем следующий месяц из архива.
+
+        Подгрузка меняет высоту списка, и проверка повторяется, пока список не
+        станет длиннее экрана или не кончится архив. При поиске архив так не
+        подгружается: для этого есть кнопка поиска.
+        """
+        if not self.data_ready or self._paging or self.search_field.text.strip():
+            return
+        if self.rows_layout.height <= self.entries_list.height:
+            months = self.store.archive_months()
+            if months:
+                self.page_in_archive(months[:1])
+    
+    def search_archive(self):
+        """Поиск и по архиву: подгружаются все еще не подгруженные месяцы"""
+        if not self.data_ready or not self.search_field.text.strip():
+            return
+        months = self.store.archive_months()
+        if months:
+            self.page_in_archive(months, for_search=True)
+    
+    def page_in_archive(self, months, for_search=False):
+        """Подгрузка месяцев архива в фоновом потоке (распаковка и разбор JSON).
+
+        Месяцы, подгруженные для поиска, выгружаются, когда запрос стерт.
+        """
+        if self._paging:
+            return
+        self._paging = True
+        if for_search:
+            self._search_months.extend(months)
+        threading.Thread(target=self._page_in_worker, args=(months,), daemon=True).start()
+    
+    def _page_in_worker(self, months):
+        batches = []  # записи каждого месяца; месяцы - от новых к старым
+        try:
+            for month in months:
+                batches.append(self.store.page_in(month))
+        except Exception as e:
+            print(f"DEBUG: Ошибка чтения архива: {e}")
+        Clock.schedule_once(lambda dt: self.on_archive_paged(batches))
+    
+    def on_archive_paged(self, batches):
+        """Месяцы из архива в памяти: добавляем их в индексы и в конец списка"""
+        self._paging = False
+        added = list(chain.from_iterable(batches))
+        # Как при запуске: сразу названия, тексты - порциями в следующих кадрах
+        for entry in added:
+            self.search_index.add(entry)
+        self._content_queue = chain(self._content_queue, [entry.id for entry in added])
+        Clock.unschedule(self._index_content)
+        Clock.schedule_once(self._index_content, 0)
+        # Записи архива старше остальных: в фасете они встают в начало своих категорий
+        for batch in batches:
+            self.facets.add_older(batch)
+        if self.search_field.text.strip() or self._search_months:
+            # Запрос могли стереть, пока шла подгрузка: тогда месяцы сразу выгружаются
+            self._perform_search(self.search_field.text)
+            return
+        # Список - новые сверху: каждый следующий месяц старше, его записи ниже
+        for entry in chain.from_iterable(map(reversed, batches)):
+            if self.current_category in ("Все", entry.category):
+                self.row_index.append(entry.id)
+                self.filtered_ids.append(entry.id)
+                self.entries_list.data.append(self._row_data(entry))
+        # В месяце могло не найтись строк для текущего фильтра - высота та же, проверяем сами
+        self._schedule_list_fill()
     
+    def unload_search_months(self):
+        """Выгружает месяцы архива, подгруженные для поиска, и убирает их из индексов"""
+        if self._paging or not self._search_months:
+            return
+        for entry_id in self.store.page_out(self._search_months):
+            self.search_index.remove(entry_id)
+            self.facets.remove(entry_id)
+        self._search_months = []
+
     def on_search_text(self, instance, value):
         """Поиск по записям с задержкой (Debounce)"""
-        # Отменяем предыдущий запланированный поиск
-        Clock.unschedule(self._perform_search)
+        # Отменяем предыдущий запланированный поиск (по его событию: лямбду
+        # через Clock.unschedule(self._perform_search) не отменить)
+        if self._search_event is not None:
+            self._search_event.cancel()
         # Планируем новый поиск через 300мс
-        Clock.schedule_once(lambda dt: self._perform_search(value), 0.3)
+        self._search_event = Clock.schedule_once(lambda dt: self._perform_search(value), 0.3)
 
     def _perform_search(self, search_text):
-        """Фактическая логика поиска"""
-        search_text = search_text.lower()
+        """Фактическая логика поиска (по индексу, совпадения в названии выше).
+
+        Запрос уходит в SearchExecutor: предыдущий поиск отменяется, а
+        найденное показывается по мере поиска (on_search_results).
+        """
+        if not self.data_ready:
+            # Запрос применится в on_data_loaded, когда загрузится индекс
+            return
+        search_text = search_text.strip()
+        category = self.current_category
         if not search_text:
-            self.filtered_entries = [e for e in self.entries if self.current_category == "Все" or e['category'] == self.current_category]
+            self.unload_search_months()
+            # Без запроса список берется прямо из фасета - O(числа записей в категории), новые сверху
+            self.search_executor.cancel()
+            if category == "Все":
+                with self.store.lock:
+                    self.filtered_ids = array('q', reversed(self.store.entries))
+            else:
+                self.filtered_ids = array('q', reversed(self.facets.entries_in(category)))
+            self.update_entries_list()
+            self._schedule_list_fill()
         else:
-            self.filtered_entries = [
-                e for e in self.entries 
-                if (self.current_category == "Все" or e['category'] == self.current_category)
-                and (search_text in e['title'].lower() or search_text in e['content'].lower())
-            ]
+            self.search_executor.submit(search_text, self.on_search_results)
+
+    def on_search_results(self, ids, done):
+        """Найденное к этому моменту (лучшие первыми), с учетом выбранной категории"""
+        category = self.current_category
+        if category == "Все":
+            entries = self.store.entries
+            self.filtered_ids = array('q', (i for i in ids if i in entries))
+        else:
+            category_of = self.facets.category_of
+            self.filtered_ids = array('q', (i for i in ids if category_of.get(i) == category))
         self.update_entries_list()
     
     def show_category_menu(self, caller):
-        """Показать меню категорий"""
-        categories = ["Все"] + list(set([e['category'] for e in self.entries]))
+        """Показать меню категорий (с количеством записей в каждой)"""
+        from kivymd.uix.menu import MDDropdownMenu
+        
+        if not self.data_ready:
+            return
+        categories = [("Все", len(self.facets))] + self.facets.counts()
         
         menu_items = [
             {
-                "text": cat,
+                "text": f"{cat} ({count})",
                 "viewclass": "OneLineListItem",
                 "on_release": lambda x=cat: self.filter_by_category(x)
             }
-            for cat in categories
+            for cat, count in categories
         ]
         
         self.category_menu = MDDropdownMenu(
@@ -471,19 +863,67 @@ class ReferenceApp(MDApp):
     # ------------------------------------------
     # Навигация и управление состоянием
     # ------------------------------------------
+    def open_detail_by_id(self, entry_id):
+        """Открыть экран деталей по id (вызывается строкой списка)"""
+        entry = self.store.get(entry_id) if self.data_ready else None
+        if entry:
+            self.open_detail_screen(entry)
+    
     def open_detail_screen(self, entry):
         """Открыть экран деталей"""
+        self._ensure_screen('detail')
         self.current_entry = entry
         
         self.detail_title.text = entry['title']
         self.detail_category.text = f"Категория: {entry['category']}"
         self.detail_date.text = f"Дата: {entry['date']}"
-        self.detail_content.text = entry['content']
+        self.show_detail_text(self.store.content(entry['id']))
         
         self.root.current = 'detail'
     
+    def show_detail_text(self, text):
+        """Текст записи кусками: первые сразу, следующие - когда прокрутка дошла до конца"""
+        self.detail_content.clear_widgets()
+        self._detail_chunks = split_text(text, DETAIL_CHUNK_CHARS)
+        self._add_detail_chunks(DETAIL_FIRST_CHUNKS)
+        self.detail_scroll.scroll_y = 1
+        self._schedule_detail_fill()
+    
+    def _add_detail_chunks(self, count):
+        from kivymd.uix.label import MDLabel
+        
+        for chunk in islice(self._detail_chunks, count):
+            label = MDLabel(
+                text=chunk,
+                font_style="Body1",
+                size_hint_y=None
+            )
+            label.bind(texture_size=label.setter('size'))
+            self.detail_content.add_widget(label)
+    
+    def on_detail_scroll(self, instance, value):
+        if value <= 0.1:
+            self._add_detail_chunks(1)
+    
+    def _schedule_detail_fill(self, *args):
+        # Высоты подписей известны только после отрисовки текстур - проверка в следующем кадре
+        Clock.unschedule(self._fill_detail_view)
+        Clock.schedule_once(self._fill_detail_view, 0)
+    
+    def _fill_detail_view(self, dt):
+        """Текст не выше экрана (прокручивать нечего) - добавляем следующий кусок.
+
+        Новый кусок меняет высоту текста, и проверка повторяется; когда куски
+        кончились, высота больше не меняется и добавление останавливается.
+        """
+        if self.detail_layout.height <= self.detail_scroll.height:
+            self._add_detail_chunks(1)
+    
     def open_add_screen(self):
         """Открыть экран добавления"""
+        if not self.data_ready:
+            return
+        self._ensure_screen('add_edit')
         self.current_entry = None
         self.add_edit_toolbar.title = "Новая запись"
         
@@ -496,11 +936,12 @@ class ReferenceApp(MDApp):
     def edit_current_entry(self):
         """Редактировать текущую запись"""
         if self.current_entry:
+            self._ensure_screen('add_edit')
             self.add_edit_toolbar.title = "Редактирование"
             
             self.title_field.text = self.current_entry['title']
             self.category_field.text = self.current_entry['category']
-            self.content_field.text = self.current_entry['content']
+            self.content_field.text = self.store.content(self.current_entry['id'])
             
             self.root.current = 'add_edit'
     
@@ -512,31 +953,48 @@ class ReferenceApp(MDApp):
         if not self.title_field.text.strip():
             self.show_alert("Ошибка", "Название не может быть пустым!")
             return
+        if self._syncing:
+            # Слияние в фоне сверяет локальные правки с сервером - правка в это время могла бы потеряться
+            self.show_alert("Синхронизация", "Дождитесь окончания синхронизации и сохраните запись еще раз")
+            return
         
         if self.current_entry:
-            # Редактирование
-            self.current_entry['title'] = self.title_field.text
-            self.current_entry['category'] = self.category_field.text
-            self.current_entry['content'] = self.content_field.text
+            # Редактирование (хранилище обновляет current_entry на месте)
+            entry = dict(
+                self.current_entry,
+                title=self.title_field.text,
+                category=self.category_field.text,
+                content=self.content_field.text,
+            )
+            entry_id = entry['id']
+            self.store.put(entry)
+            self.search_index.update(entry)
+            self.facets.update(entry_id, entry['category'])
+            self.sync_client.note_edited(entry_id)
         else:
-            # Новая запись
-            new_id = max([e['id'] for e in self.entries], default=0) + 1
+            # Новая запись (id - из счетчика хранилища, без перебора всех записей)
+            entry_id = self.store.next_id()
             new_entry = {
-                "id": new_id,
+                "id": entry_id,
                 "title": self.title_field.text,
                 "category": self.category_field.text,
                 "content": self.content_field.text,
                 "date": datetime.now().strftime("%Y-%m-%d")
             }
-            self.entries.append(new_entry)
+            self.store.put(new_entry)
+            self.search_index.add(new_entry)
+            self.facets.add(entry_id, new_entry['category'])
+            self.sync_client.note_created(entry_id)
         
-        self.save_data()
-        self.filtered_entries = self.entries.copy()
-        self.update_entries_list()
+        # Меняется только строка этой записи, остальной список не пересобирается
+        self.refresh_entry_row(entry_id)
         self.go_back()
     
     def delete_current_entry(self):
         """Удалить текущую запись"""
+        from kivymd.uix.button import MDFlatButton, MDRaisedButton
+        from kivymd.uix.dialog import MDDialog
+        
         if not self.current_entry:
             return
         
@@ -558,11 +1016,15 @@ class ReferenceApp(MDApp):
     
     def confirm_delete(self):
         """Подтверждение удаления"""
-        self.entries = [e for e in self.entries if e['id'] != self.current_entry['id']]
-        self.save_data()
-        self.filtered_entries = self.entries.copy()
-        self.update_entries_list()
         self.dialog.dismiss()
+        if self._syncing:
+            self.show_alert("Синхронизация", "Дождитесь окончания синхронизации и удалите запись еще раз")
+            return
+        self.store.delete(self.current_entry['id'])
+        self.search_index.remove(self.current_entry['id'])
+        self.facets.remove(self.current_entry['id'])
+        self.sync_client.note_deleted(self.current_entry['id'])
+        self.refresh_entry_row(self.current_entry['id'])
         self.go_back()
     
     # ------------------------------------------
@@ -570,6 +1032,9 @@ class ReferenceApp(MDApp):
     # ------------------------------------------
     def show_alert(self, title, text):
         """Показать уведомление"""
+        from kivymd.uix.button import MDFlatButton
+        from kivymd.uix.dialog import MDDialog
+        
         dialog = MDDialog(
             title=title,
             text=text,
@@ -585,6 +1050,16 @@ class ReferenceApp(MDApp):
     def go_back(self):
         """Вернуться назад"""
         self.root.current = 'main'
+    
+    def on_pause(self):
+        """Сворачивание (Android): дописываем отложенное, процесс могут убить"""
+        self.writer.flush()
+        return True
+
+    def on_stop(self):
+        """Закрытие приложения: дописываем отложенное и дожидаемся сжатия журнала"""
+        self.writer.close()
+        self.store.close()
 
 
 # ==========================================
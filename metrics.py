@@ -0,0 +1,137 @@
+# ==========================================
+# Замеры одного запуска парсера
+# Таймеры этапов, счетчики и сетевые запросы, итог - JSON-отчет
+# ==========================================
+import cProfile
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from persist import atomic_write_json
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+class RunMetrics:
+    """Счетчики и таймеры одного запуска.
+
+    Все методы потокобезопасны: этапы идут параллельно в потоках источников
+    и скачивания статей, поэтому время этапа - это сумма по всем потокам,
+    а общее время запуска хранится отдельно (wall_seconds).
+    """
+
+    def __init__(self, profile=False):
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.stages = {}    # этап -> {"calls": ..., "seconds": ...}
+        self.counters = {}  # счетчик -> число
+        self.requests = []  # сетевые запросы по порядку
+        self.profile = profile
+        self._profiles = []
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name, seconds):
+        with self.lock:
+            stage = self.stages.setdefault(name, {"calls": 0, "seconds": 0.0})
+            stage['calls'] += 1
+            stage['seconds'] += seconds
+
+    def incr(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def record_request(self, url, status, seconds, nbytes):
+        with self.lock:
+            self.requests.append({
+                "url": url,
+                "status": status,
+                "ms": round(seconds * 1000, 2),
+                "bytes": nbytes,
+            })
+
+    # ------------------------------------------
+    # Профилирование (--profile)
+    # ------------------------------------------
+    def profiled(self, func):
+        """Обертка, которая профилирует каждый вызов func в своем потоке.
+
+        cProfile видит только поток, в котором включен, поэтому потоки
+        источников и скачивания статей профилируются отдельно и
+        объединяются в dump_profile().
+        """
+        if not self.profile:
+            return func
+
+        def wrapper(*args, **kwargs):
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.disable()
+                with self.lock:
+                    self._profiles.append(profiler)
+        return wrapper
+
+    def dump_profile(self, path):
+        with self.lock:
+            profiles = list(self._profiles)
+        if not profiles:
+            return False
+        stats = pstats.Stats(profiles[0])
+        for profiler in profiles[1:]:
+            stats.add(profiler)
+        stats.dump_stats(path)
+        return True
+
+    # ------------------------------------------
+    # Отчет
+    # ------------------------------------------
+    def report(self):
+        with self.lock:
+            requests = list(self.requests)
+            stages = {name: dict(v, seconds=round(v['seconds'], 4)) for name, v in self.stages.items()}
+            counters = dict(self.counters)
+        latencies = [r['ms'] for r in requests]
+        hosts = {}
+        for r in requests:
+            host = hosts.setdefault(urlsplit(r['url']).hostname or "", {"requests": 0, "bytes": 0, "ms": 0.0})
+            host['requests'] += 1
+            host['bytes'] += r['bytes']
+            host['ms'] = round(host['ms'] + r['ms'], 2)
+        return {
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(self.started_at)),
+            "wall_seconds": round(time.perf_counter() - self._started, 3),
+            "stages": stages,
+            "counters": counters,
+            "network": {
+                "requests": len(requests),
+                "bytes": sum(r['bytes'] for r in requests),
+                "not_modified": sum(1 for r in requests if r['status'] == 304),
+                "latency_ms": {
+                    "p50": _percentile(latencies, 0.5),
+                    "p95": _percentile(latencies, 0.95),
+                    "max": max(latencies, default=0.0),
+                },
+                "hosts": hosts,
+            },
+            "requests": requests,
+        }
+
+    def save(self, path):
+        atomic_write_json(path, self.report(), indent=2)
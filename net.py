@@ -0,0 +1,190 @@
+# ==========================================
+# Сетевые утилиты парсера
+# Ограничение частоты запросов, пул соединений и кэш условных запросов
+# ==========================================
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from persist import atomic_write_json
+
+
+class TokenBucket:
+    """Корзина токенов: в среднем rate запросов в секунду, не более burst подряд"""
+
+    def __init__(self, rate=1.0, burst=1):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Ждет, пока в корзине появится токен, и забирает его"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            # Спим вне блокировки, чтобы не мешать запросам к другим сайтам
+            time.sleep(wait)
+
+
+class HostRateLimiter:
+    """Отдельная корзина токенов для каждого хоста.
+
+    host_limits позволяет задать свои (rate, burst) для конкретных сайтов,
+    например {"news.ycombinator.com": (0.5, 1)}.
+    """
+
+    def __init__(self, rate=1.0, burst=1, host_limits=None):
+        self.rate = rate
+        self.burst = burst
+        self.host_limits = host_limits or {}
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket_for(self, url):
+        host = (urlsplit(url).hostname or "").lower()
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                rate, burst = self.host_limits.get(host, (self.rate, self.burst))
+                bucket = TokenBucket(rate, burst)
+                self.buckets[host] = bucket
+            return bucket
+
+    def acquire(self, url):
+        """Блокирует поток, пока к хосту из url снова можно обратиться"""
+        self.bucket_for(url).acquire()
+
+
+class ValidatorCache:
+    """Хранит на диске ETag и Last-Modified страниц (по одному файлу на URL)"""
+
+    def __init__(self, cache_dir=".http_cache"):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, url):
+        name = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, name + ".json")
+
+    def get(self, url):
+        try:
+            with open(self._path(url), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def put(self, url, etag=None, last_modified=None):
+        meta = {"url": url, "etag": etag, "last_modified": last_modified}
+        atomic_write_json(self._path(url), meta)
+
+
+class StreamedBody:
+    """Тело ответа, запрошенного со stream=True, порциями.
+
+    Читается не больше max_bytes (truncated - обрезали ли тело). Чтение
+    можно прервать в любой момент: close() закрывает соединение и
+    записывает в отчет запуска только реально прочитанный объем.
+    """
+
+    def __init__(self, url, response, metrics=None, chunk_size=16 * 1024, max_bytes=None):
+        self.url = url
+        self.response = response
+        self.metrics = metrics
+        self.chunk_size = chunk_size
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.truncated = False
+        self._started = time.perf_counter()
+        self._closed = False
+
+    def __iter__(self):
+        for chunk in self.response.iter_content(self.chunk_size):
+            if self.max_bytes is not None and self.nbytes + len(chunk) > self.max_bytes:
+                chunk = chunk[:self.max_bytes - self.nbytes]
+                self.truncated = True
+            self.nbytes += len(chunk)
+            yield chunk
+            if self.truncated:
+                return
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self.response.close()
+        if self.metrics:
+            # Время ожидания заголовков + время чтения тела
+            seconds = self.response.elapsed.total_seconds() + time.perf_counter() - self._started
+            self.metrics.record_request(self.url, self.response.status_code, seconds, self.nbytes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CachedSession:
+    """Общая сессия requests с пулом соединений и условными запросами.
+
+    При conditional=True к запросу добавляются If-None-Match/If-Modified-Since,
+    и неизмененная страница приходит как 304 без тела. Валидаторы сохраняются
+    только через remember(), то есть после успешной обработки страницы.
+    """
+
+    def __init__(self, cache_dir=".http_cache", pool_size=10, timeout=10, metrics=None):
+        self.timeout = timeout
+        # RunMetrics: задержка и объем каждого запроса попадают в отчет запуска
+        self.metrics = metrics
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.cache = ValidatorCache(cache_dir) if cache_dir else None
+
+    def get(self, url, conditional=False, **kwargs):
+        headers = dict(kwargs.pop('headers', None) or {})
+        if conditional and self.cache:
+            meta = self.cache.get(url)
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        kwargs.setdefault('timeout', self.timeout)
+        start = time.perf_counter()
+        res = self.session.get(url, headers=headers, **kwargs)
+        # Потоковый ответ учитывается в StreamedBody.close(): len(res.content) скачал бы его целиком
+        if self.metrics and not kwargs.get('stream'):
+            self.metrics.record_request(url, res.status_code, time.perf_counter() - start, len(res.content))
+        return res
+
+    def stream(self, url, max_bytes=None, chunk_size=16 * 1024, **kwargs):
+        """GET со stream=True; тело читается через возвращаемый StreamedBody"""
+        res = self.get(url, stream=True, **kwargs)
+        return StreamedBody(url, res, self.metrics, chunk_size, max_bytes)
+
+    def remember(self, url, res):
+        """Запоминает валидаторы ответа для следующего условного запроса"""
+        if not self.cache or res.status_code != 200:
+            return
+        etag = res.headers.get('ETag')
+        last_modified = res.headers.get('Last-Modified')
+        if etag or last_modified:
+            self.cache.put(url, etag, last_modified)
+
+    def close(self):
+        self.session.close()
@@ -1,136 +1,404 @@
-import requests
-from bs4 import BeautifulSoup
-import json
+import argparse
+import codecs
+import multiprocessing
 import os
-from datetime import datetime
+import queue
+import random
+import threading
 import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from articles import ContentCache, RetryQueue, is_transient
+from dedup import DedupIndex
+from extract import ArticleStream, extract_bytes
+from metrics import RunMetrics
+from net import CachedSession, HostRateLimiter
+from scheduler import PollScheduler
+from sources import SOURCES
+from storage import EntryStore
+from sync import MANIFEST_FILE, publish_shards
+
+# Признак того, что источник закончил работу
+_DONE = object()
+
+
+def _text_decoder(encoding):
+    """Декодер для тела, которое приходит кусками (многобайтный символ может попасть на стык)"""
+    try:
+        return codecs.getincrementaldecoder(encoding or 'utf-8')(errors='replace')
+    except LookupError:
+        return codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+def _pool_context():
+    """forkserver (Linux, macOS) или spawn: пул не наследует потоки и блокировки родителя"""
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
 
 class NewsParser:
-    def __init__(self):
+    def __init__(self, max_workers=4, rate_per_host=1.0, burst=1, host_limits=None,
+                 http_cache_dir=".http_cache", source_timeout=None, metrics=None,
+                 article_cache_dir=".article_cache", article_ttl=7 * 24 * 3600, retries=3, retry_delay=1.0,
+                 keep_months=None, full_articles=False, article_max_bytes=1024 * 1024, extract_workers=0):
+        # Таймеры этапов и счетчики запуска (сохраняются в JSON-отчет)
+        self.metrics = metrics or RunMetrics()
         self.data_file = "data.json"
+        self.store = EntryStore(self.data_file)
+        # Хэши известных URL и заголовков: дубликаты отсекаются еще до скачивания
+        self.dedup = DedupIndex("dedup_index.json")
+        # Уже извлеченный текст статей (по URL) и статьи, которые не скачались
+        self.content_cache = ContentCache(article_cache_dir, ttl=article_ttl) if article_cache_dir else None
+        self.retry_queue = RetryQueue("retry_queue.json")
+        self.article_errors = {}  # url -> последняя ошибка скачивания (для очереди повторов)
+        self.source_counts = {}   # источник -> сколько новых записей он отдал за последний запуск
+        # Сколько раз пробовать статью за запуск и пауза перед второй попыткой (дальше вдвое больше)
+        self.retries = retries
+        self.retry_delay = retry_delay
+        # Сохранять статью целиком, а не первые 3 абзаца (в хранилище длинные тексты сжимаются)
+        self.full_articles = full_articles
+        # Страница статьи читается потоком и не дальше стольких байт (None - без ограничения)
+        self.article_max_bytes = article_max_bytes
+        # Сколько последних месяцев держать в data.json, остальные - в archive/ (None - не архивировать).
+        # Только для локальной базы: публикуемый data.json должен оставаться полным
+        self.keep_months = keep_months
+        # Журнал уже свернут в data.json, а шарды еще не опубликованы (прошлый запуск прервался)
+        self._unpublished = False
+        self._loaded = False
+        self._load_lock = threading.Lock()
+        # Общий лимит времени на источник (None - берется из класса источника)
+        self.source_timeout = source_timeout
+        # Сколько статей скачивается одновременно
+        self.max_workers = max_workers
+        # Разбор HTML в отдельных процессах (обход GIL при массовом обходе); 0 - в потоках скачивания
+        self.extract_workers = extract_workers
+        self._extract_pool = None
+        if extract_workers:
+            # Пул создается сразу: потоки источников им только пользуются. Процессы
+            # не форкаются - копия процесса с потоками может унаследовать занятую блокировку
+            self._extract_pool = ProcessPoolExecutor(max_workers=extract_workers, mp_context=_pool_context())
+        # Вежливость к сайтам: не чаще rate_per_host запросов в секунду на один хост
+        self.limiter = HostRateLimiter(rate_per_host, burst, host_limits)
+        # Одна сессия на весь запуск: соединения переиспользуются, страницы проверяются по ETag
+        self.session = CachedSession(http_cache_dir, pool_size=max(max_workers, 2), metrics=self.metrics)
         
-    def get_local_data(self):
-        if os.path.exists(self.data_file):
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return []
+    def load_known(self):
+        """Один раз за запуск читает хранилище и индекс дубликатов"""
+        with self._load_lock:
+            if not self._loaded:
+                with self.metrics.stage("load"):
+                    self.dedup.load(self.store.load(), self.store.full)
+                    self.retry_queue.load()
+                self._loaded = True
+
+    def is_known(self, url, title):
+        self.load_known()
+        if self.dedup.seen(url, title):
+            self.metrics.incr("dedup.hits")
+            return True
+        return False
 
-    def save_local_data(self, data):
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+    def extract_page(self, kind, data, encoding=None, **kwargs):
+        """Разбор страницы разборщиком kind из extract.EXTRACTORS.
+
+        С extract_workers > 0 - в пуле процессов: туда уходят сырые байты,
+        обратно приходят только строки списка или абзацы.
+        """
+        if self._extract_pool is None:
+            return extract_bytes(kind, data, encoding, **kwargs)
+        return self._extract_pool.submit(extract_bytes, kind, data, encoding, **kwargs).result()
+
+    def close(self):
+        self.session.close()
+        if self._extract_pool is not None:
+            self._extract_pool.shutdown()
+            self._extract_pool = None
 
     def get_article_content(self, url):
-        """Заходит внутрь статьи и забирает первые 3 абзаца текста"""
-        try:
-            # Небольшая пауза, чтобы сайт нас не забанил за частые запросы
-            time.sleep(1) 
-            res = requests.get(url, timeout=10)
-            soup = BeautifulSoup(res.text, 'html.parser')
-            
-            # На сайте python.org основной текст статьи обычно в div.article-content или div.p-main
-            # Но самый надежный способ - просто собрать все теги <p> внутри основной секции
-            content_div = soup.find('div', class_='main-content') or soup.find('section', class_='main-content')
-            if not content_div:
-                return "Краткое содержание недоступно (не удалось найти блок текста)."
-            
-            paragraphs = content_div.find_all('p')
-            # Берем первые 3 содержательных абзаца
-            text_parts = []
-            for p in paragraphs:
-                text = p.text.strip()
-                if len(text) > 40: # Игнорируем слишком короткие строки (даты, подписи)
-                    text_parts.append(text)
-                if len(text_parts) >= 3: # Лимит: 3 абзаца
+        """Текст статьи: из кэша или со страницы. None, если скачать не удалось.
+
+        Временные ошибки (обрыв, таймаут, 429, 5xx) повторяются с растущей
+        паузой; текст ошибки больше не попадает в содержимое записи.
+        """
+        # Полный текст и первые абзацы кэшируются отдельно
+        cache_key = url + "#full" if self.full_articles else url
+        if self.content_cache is not None:
+            text = self.content_cache.get(cache_key)
+            if text is not None:
+                self.metrics.incr("articles.cache_hits")
+                return text
+        delay = self.retry_delay
+        for attempt in range(1, self.retries + 1):
+            try:
+                text = self._download_article(url)
+            except Exception as e:
+                if attempt == self.retries or not is_transient(e):
+                    self.metrics.incr("articles.failed")
+                    self.article_errors[url] = str(e)
+                    print(f"  Не удалось загрузить статью {url}: {e}")
+                    return None
+                self.metrics.incr("articles.retries")
+                # Случайная добавка, чтобы параллельные потоки не повторяли запросы одновременно
+                time.sleep(delay + random.uniform(0, delay / 2))
+                delay *= 2
+            else:
+                if self.content_cache is not None:
+                    self.content_cache.put(cache_key, text)
+                return text
+
+    def _download_article(self, url):
+        """Заходит внутрь статьи и забирает первые 3 абзаца текста (или все с full_articles).
+
+        Страница читается потоком и сразу разбирается: как только набраны
+        нужные абзацы (или прочитано article_max_bytes), соединение
+        закрывается и остаток страницы не скачивается. С extract_workers > 0
+        страница читается целиком (до article_max_bytes) и разбирается в пуле
+        процессов: ранней остановки нет, зато разбор не упирается в GIL.
+        """
+        # Ждем своей очереди к этому сайту, чтобы нас не забанили за частые запросы
+        with self.metrics.stage("rate_limit.wait"):
+            self.limiter.acquire(url)
+        max_paragraphs = None if self.full_articles else 3
+        if self.extract_workers:
+            # Разбор в пуле процессов: страница скачивается целиком (до article_max_bytes)
+            with self.metrics.stage("fetch.article"):
+                with self.session.stream(url, max_bytes=self.article_max_bytes) as body:
+                    body.response.raise_for_status()
+                    data = b"".join(body)
+                    encoding = body.response.encoding
+            with self.metrics.stage("parse.article"):
+                text_parts = self.extract_page("article", data, encoding, max_paragraphs=max_paragraphs)
+            self.metrics.incr("articles.fetched")
+            return self._article_text(text_parts)
+        started = time.perf_counter()
+        parse_seconds = 0.0
+        # Разбирается только блок main-content, дерево страницы не строится
+        article = ArticleStream(max_paragraphs=max_paragraphs)
+        with self.session.stream(url, max_bytes=self.article_max_bytes) as body:
+            body.response.raise_for_status()
+            decoder = _text_decoder(body.response.encoding)
+            for chunk in body:
+                start = time.perf_counter()
+                article.feed(decoder.decode(chunk))
+                parse_seconds += time.perf_counter() - start
+                if article.done:
+                    self.metrics.incr("articles.early_stop")
                     break
-            
-            if not text_parts:
-                return "Краткое содержание недоступно."
-                
-            return "\n\n".join(text_parts)
-        except Exception as e:
-            return f"Не удалось загрузить содержание статьи ({e})."
-
-    # --- ИСТОЧНИК 1: Python.org (Теперь с заходом внутрь) ---
-    def parse_python_org(self):
-        print("Сканирую Python.org...")
-        url = "https://www.python.org/blogs/"
-        try:
-            res = requests.get(url)
-            soup = BeautifulSoup(res.text, 'html.parser')
-            posts = soup.find('ul', class_='list-recent-posts').find_all('li')
-            
-            current_data = self.get_local_data()
-            existing_titles = [e['title'] for e in current_data]
-            
-            results = []
-            for p in posts[:5]: # Берем только последние 5 новостей за раз, чтобы не нагружать сайт
-                link_tag = p.find('a')
-                title = link_tag.text
-                article_url = link_tag['href']
-                
-                # Если такой новости еще нет в базе, заходим внутрь
-                if title not in existing_titles:
-                    print(f"  -> Захожу в статью: {title}")
-                    full_content = self.get_article_content(article_url)
-                    
-                    results.append({
-                        "title": title,
-                        "category": "Язык Программирование",
-                        "content": f"{full_content}\n\nПолный источник: {article_url}",
-                        "date": p.find('time').get('datetime')[:10]
-                    })
-                else:
-                    print(f"  (Пропуск: {title} уже есть)")
-            return results
-        except:
-            print("Ошибка парсинга Python.org")
-            return []
-
-    # --- ИСТОЧНИК 2: Hacker News ---
-    def parse_hacker_news(self):
-        print("Сканирую Hacker News...")
-        url = "https://news.ycombinator.com/"
-        try:
-            res = requests.get(url)
-            soup = BeautifulSoup(res.text, 'html.parser')
-            lines = soup.find_all('tr', class_='athing')
-            
-            results = []
-            for line in lines[:10]:
-                title_line = line.find('span', class_='titleline')
-                link_tag = title_line.find('a')
-                
-                results.append({
-                    "title": link_tag.text,
-                    "category": "Новости IT",
-                    "content": f"Популярное обсуждение на Hacker News.\n\nСсылка на источник: {link_tag['href']}",
-                    "date": datetime.now().strftime("%Y-%m-%d")
-                })
-            return results
-        except:
-            print("Ошибка парсинга Hacker News")
-            return []
-
-    def run_all(self):
-        all_new_news = []
-        all_new_news.extend(self.parse_python_org())
-        all_new_news.extend(self.parse_hacker_news())
+            if body.truncated and not article.done:
+                self.metrics.incr("articles.truncated")
+        start = time.perf_counter()
+        if not article.done:
+            # Дочитанная страница: хвост декодера и недоразобранный остаток
+            article.feed(decoder.decode(b"", final=True))
+            article.close()
+        text_parts = article.result()
+        parse_seconds += time.perf_counter() - start
+        self.metrics.add_time("fetch.article", time.perf_counter() - started - parse_seconds)
+        self.metrics.add_time("parse.article", parse_seconds)
+        self.metrics.incr("articles.fetched")
+        return self._article_text(text_parts)
+
+    @staticmethod
+    def _article_text(text_parts):
+        if text_parts is None:
+            return "Краткое содержание недоступно (не удалось найти блок текста)."
+        if not text_parts:
+            return "Краткое содержание недоступно."
+        return "\n\n".join(text_parts)
+
+    def iter_articles(self, urls):
+        """Генератор содержимого статей: качаются параллельно, отдаются по порядку"""
+        urls = list(urls)
+        if self.max_workers <= 1 or len(urls) <= 1:
+            for url in urls:
+                yield self.get_article_content(url)
+            return
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(urls))) as pool:
+            yield from pool.map(self.metrics.profiled(self.get_article_content), urls)
+
+    # ------------------------------------------
+    # Пайплайн: источники -> дубликаты -> сохранение
+    # ------------------------------------------
+    def stream_sources(self, names=None):
+        """Запускает источники параллельно и отдает записи по мере готовности.
+
+        Каждый источник работает в своем daemon-потоке, поэтому зависший
+        сайт не держит ни остальные источники, ни завершение скрипта:
+        по истечении timeout его записи просто перестают приниматься.
+        """
+        results = queue.Queue()
+        sources = [SOURCES[name](self) for name in (names or SOURCES)]
+        deadlines = {}
         
-        current_data = self.get_local_data()
-        existing_titles = [e['title'] for e in current_data]
-        last_id = max([e['id'] for e in current_data], default=0)
+        def worker(source):
+            try:
+                for item in source.items():
+                    results.put((source, item))
+            except Exception as e:
+                self.metrics.incr("sources.failed")
+                print(f"Ошибка источника {source.name}: {e}")
+            finally:
+                results.put((source, _DONE))
         
-        added_count = 0
-        for item in all_new_news:
-            if item['title'] not in existing_titles:
-                last_id += 1
-                item['id'] = last_id
-                current_data.append(item)
-                added_count += 1
+        for source in sources:
+            print(f"Сканирую {source.name} ({source.url})...")
+            timeout = self.source_timeout or source.timeout
+            deadlines[source] = time.monotonic() + timeout
+            threading.Thread(target=self.metrics.profiled(worker), args=(source,), daemon=True).start()
         
-        self.save_local_data(current_data)
-        print(f"Общая работа завершена. Добавлено: {added_count} новых глубоких записей.")
+        while deadlines:
+            wait = min(deadlines.values()) - time.monotonic()
+            try:
+                source, item = results.get(timeout=max(wait, 0))
+            except queue.Empty:
+                now = time.monotonic()
+                for source, deadline in list(deadlines.items()):
+                    if deadline <= now:
+                        self.metrics.incr("sources.timed_out")
+                        print(f"Источник {source.name} не уложился в отведенное время, пропускаю")
+                        del deadlines[source]
+                continue
+            if source not in deadlines:
+                continue  # опоздавшие записи источника, который сняли по таймауту
+            if item is _DONE:
+                del deadlines[source]
+                # Все записи источника уже прошли пайплайн - можно запомнить ETag
+                source.finish()
+            else:
+                self.source_counts[source.name] = self.source_counts.get(source.name, 0) + 1
+                yield item
+
+    def dedup_stage(self, items):
+        """Отсекает записи, которые уже есть в базе или пришли из другого источника"""
+        for item in items:
+            if self.dedup.seen_entry(item):
+                self.metrics.incr("dedup.hits")
+            else:
+                yield item
+
+    def persist_stage(self, items):
+        """Сразу дописывает каждую новую запись в журнал хранилища"""
+        last_id = self.store.next_id() - 1
+        added = 0
+        for item in items:
+            last_id += 1
+            item['id'] = last_id
+            with self.metrics.stage("persist"):
+                self.store.put(item)
+                self.dedup.add_entry(item)
+            self.metrics.incr("items.written")
+            added += 1
+            print(f"  + {item['title']}")
+        return added
+
+    def run_all(self, sources=None):
+        self.load_known()
+        self.source_counts = {}
+        added = self.persist_stage(self.dedup_stage(self.stream_sources(sources)))
+        
+        # data.json - файл обмена для GitHub, поэтому в конце запуска сворачиваем в него журнал
+        # (если записей не прибавилось и журнала нет, data.json и шарды не трогаем)
+        changed = added or os.path.exists(self.store.journal_path) or self._unpublished
+        if changed:
+            self._unpublished = True
+            with self.metrics.stage("save"):
+                self.store.compact()
+                if self.keep_months:
+                    # Раз в месяц самый старый месяц уходит из data.json в сжатый архив
+                    moved = self.store.archive_old(self.keep_months)
+                    self.metrics.incr("archive.moved", len(moved))
+        # Манифест и помесячные шарды для дельта-синхронизации приложения
+        with self.metrics.stage("publish"):
+            if changed or not os.path.exists(MANIFEST_FILE):
+                publish_shards(self.store.iter_full(), frozen=self.store.archive.months())
+                self._unpublished = False
+            self.dedup.save()
+            self.retry_queue.save()
+        print(f"Общая работа завершена. Добавлено: {added} новых глубоких записей.")
+        return added
+
+    # ------------------------------------------
+    # Режим демона (--daemon)
+    # ------------------------------------------
+    def use_metrics(self, metrics):
+        """Новые счетчики для следующего цикла демона (отчет - за один цикл)"""
+        self.metrics = metrics
+        self.session.metrics = metrics
+
+    def run_daemon(self, scheduler=None, max_cycles=None, on_cycle=None, sleep=time.sleep):
+        """Опрашивает источники бесконечно, каждый - по своему расписанию.
+
+        Сессия с открытыми соединениями, ETag страниц, кэш статей, индекс
+        дубликатов и хранилище остаются в памяти между циклами: загружаются
+        один раз, а не при каждом запуске по cron. on_cycle(due, added)
+        вызывается после каждого цикла (например, чтобы сохранить отчет).
+        Ошибка в цикле не останавливает демон: источники цикла считаются
+        не давшими новых записей, несохраненное досохраняется в следующем.
+        """
+        scheduler = scheduler or PollScheduler(SOURCES)
+        cycles = 0
+        while max_cycles is None or cycles < max_cycles:
+            due = scheduler.due()
+            if not due:
+                sleep(scheduler.wait_time())
+                continue
+            print(f"Цикл {cycles + 1}: опрашиваю {', '.join(due)}")
+            try:
+                added = self.metrics.profiled(self.run_all)(due)
+            except Exception as e:
+                print(f"Ошибка в цикле {cycles + 1}: {e!r}")
+                self.metrics.incr("daemon.failed_cycles")
+                self.source_counts = {}
+                added = 0
+            for name in due:
+                scheduler.observe(name, self.source_counts.get(name, 0))
+            scheduler.save()
+            if on_cycle is not None:
+                on_cycle(due, added)
+            cycles += 1
+        return cycles
 
 if __name__ == "__main__":
-    parser = NewsParser()
-    parser.run_all()
+    cli = argparse.ArgumentParser(description="Парсер новостей для справочника")
+    cli.add_argument("--workers", type=int, default=4, help="сколько статей качать одновременно")
+    cli.add_argument("--rate", type=float, default=1.0, help="запросов в секунду к одному сайту")
+    cli.add_argument("--burst", type=int, default=1, help="сколько запросов к сайту можно сделать подряд")
+    cli.add_argument("--sources", nargs="+", choices=sorted(SOURCES), help="какие источники опрашивать (по умолчанию все)")
+    cli.add_argument("--source-timeout", type=float, help="сколько секунд ждать один источник")
+    cli.add_argument("--retries", type=int, default=3, help="сколько раз пробовать скачать статью за запуск")
+    cli.add_argument("--full-articles", action="store_true", help="сохранять статьи целиком, а не первые 3 абзаца")
+    cli.add_argument("--article-max-kb", type=int, default=1024, help="сколько КБ страницы статьи читать не больше")
+    cli.add_argument("--extract-workers", type=int, default=0,
+                     help="сколько процессов разбирают HTML (0 - разбор в потоках скачивания)")
+    cli.add_argument("--keep-months", type=int,
+                     help="сколько последних месяцев держать в data.json (старые уходят в archive/); "
+                          "не для публикуемого data.json - старые версии приложения качают его целиком")
+    cli.add_argument("--daemon", action="store_true", help="не завершаться: опрашивать источники по адаптивному расписанию")
+    cli.add_argument("--max-cycles", type=int, help="в режиме демона: остановиться после стольких циклов опроса")
+    cli.add_argument("--report", help="сохранить JSON-отчет о запуске (время этапов, запросы, счетчики)")
+    cli.add_argument("--profile", help="сохранить профиль cProfile (смотреть через python -m pstats)")
+    args = cli.parse_args()
+    
+    metrics = RunMetrics(profile=bool(args.profile))
+    parser = NewsParser(max_workers=args.workers, rate_per_host=args.rate, burst=args.burst,
+                        source_timeout=args.source_timeout, metrics=metrics, retries=args.retries,
+                        keep_months=args.keep_months, full_articles=args.full_articles,
+                        article_max_bytes=args.article_max_kb * 1024, extract_workers=args.extract_workers)
+    try:
+        if args.daemon:
+            def on_cycle(due, added):
+                # Отчет и профиль - за последний цикл, счетчики следующего цикла начинаются с нуля
+                if args.report:
+                    parser.metrics.save(args.report)
+                if args.profile:
+                    parser.metrics.dump_profile(args.profile)
+                parser.use_metrics(RunMetrics(profile=bool(args.profile)))
+            scheduler = PollScheduler({name: SOURCES[name] for name in (args.sources or SOURCES)})
+            parser.run_daemon(scheduler, max_cycles=args.max_cycles, on_cycle=on_cycle)
+        else:
+            metrics.profiled(parser.run_all)(args.sources)
+    finally:
+        parser.close()
+        if args.report:
+            parser.metrics.save(args.report)
+        if args.profile:
+            # В демоне профиль последнего полного цикла уже сохранен в on_cycle
+            parser.metrics.dump_profile(args.profile)
@@ -0,0 +1,112 @@
+# ==========================================
+# Отложенная запись на диск в фоновом потоке (write-behind)
+# Приложение только ставит запись в очередь, а файлы пишет отдельный
+# поток, поэтому диск и JSON не тормозят отрисовку интерфейса
+# ==========================================
+import json
+import os
+import threading
+import time
+from functools import partial
+
+
+def atomic_write(path, data):
+    """Пишет файл целиком через временный файл и os.replace"""
+    tmp = path + ".tmp"
+    mode = 'wb' if isinstance(data, bytes) else 'w'
+    with open(tmp, mode, **({} if mode == 'wb' else {"encoding": "utf-8"})) as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def atomic_write_json(path, data, **kwargs):
+    kwargs.setdefault('ensure_ascii', False)
+    atomic_write(path, json.dumps(data, **kwargs))
+
+
+class WriteBehind:
+    """Фоновый поток записи с задержкой и склейкой.
+
+    schedule(key, func) откладывает вызов func на delay секунд; повторный
+    вызов с тем же key до записи заменяет func и сдвигает срок (debounce),
+    но не дальше max_delay от первого вызова, так что частые изменения
+    превращаются в одну запись. Колбэки получают ошибку (или None) через
+    dispatch - в приложении это Clock.schedule_once, то есть главный поток.
+    flush() выполняет все отложенное сразу (выход из приложения).
+    """
+
+    def __init__(self, delay=0.5, max_delay=3.0, dispatch=None):
+        self.delay = delay
+        self.max_delay = max_delay
+        self.dispatch = dispatch or (lambda func: func())
+        self._jobs = {}  # key -> {"func", "due", "deadline", "callbacks"}
+        self._cond = threading.Condition()
+        self._busy = False
+        self._flushing = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def schedule(self, key, func, callback=None, delay=None):
+        now = time.monotonic()
+        with self._cond:
+            job = self._jobs.get(key)
+            if job is None:
+                job = self._jobs[key] = {"deadline": now + self.max_delay, "callbacks": []}
+            job['func'] = func
+            job['due'] = min(now + (self.delay if delay is None else delay), job['deadline'])
+            if callback is not None:
+                job['callbacks'].append(callback)
+            self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """Выполняет все отложенные записи сейчас и ждет их окончания"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._flushing += 1
+            self._cond.notify_all()
+            try:
+                while self._jobs or self._busy:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+            finally:
+                self._flushing -= 1
+        return True
+
+    def close(self):
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed and not self._jobs:
+                        return
+                    now = time.monotonic()
+                    ready = [key for key, job in self._jobs.items() if self._flushing or job['due'] <= now]
+                    if ready:
+                        break
+                    timeout = min(job['due'] for job in self._jobs.values()) - now if self._jobs else None
+                    self._cond.wait(timeout)
+                jobs = [self._jobs.pop(key) for key in ready]
+                self._busy = True
+            for job in jobs:
+                error = None
+                try:
+                    job['func']()
+                except Exception as e:
+                    print(f"DEBUG: Ошибка фоновой записи: {e}")
+                    error = e
+                for callback in job['callbacks']:
+                    self.dispatch(partial(callback, error))
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
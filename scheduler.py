@@ -0,0 +1,76 @@
+# ==========================================
+# Расписание опроса источников для долгоживущего режима парсера
+# У каждого источника свой интервал: он сокращается, когда источник
+# приносит новые записи, и растет, пока новых записей нет
+# ==========================================
+import json
+import os
+import time
+
+from persist import atomic_write_json
+
+
+class PollScheduler:
+    """Адаптивные интервалы опроса по источникам.
+
+    Начальный интервал - poll_interval класса источника. После опроса
+    observe(name, new_items) делит интервал на speedup, если пришли новые
+    записи, и умножает на backoff, если нет; интервал держится в пределах
+    [poll_interval * min_factor, poll_interval * max_factor]. Выученные
+    интервалы сохраняются в path, так что перезапуск демона их не теряет.
+    """
+
+    def __init__(self, sources, path="poll_schedule.json", speedup=2.0, backoff=1.5,
+                 min_factor=0.25, max_factor=8.0, clock=time.time):
+        self.path = path
+        self.speedup = speedup
+        self.backoff = backoff
+        self.clock = clock
+        self.bounds = {}  # имя -> (мин. интервал, макс. интервал)
+        self.state = {}   # имя -> {"interval", "next_poll", "polls", "items"}
+        saved = self._load()
+        now = clock()
+        for name, cls in sources.items():
+            self.bounds[name] = (cls.poll_interval * min_factor, cls.poll_interval * max_factor)
+            state = saved.get(name) or {"interval": cls.poll_interval, "next_poll": now, "polls": 0, "items": 0}
+            state['interval'] = self._clamp(name, state['interval'])
+            self.state[name] = state
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _clamp(self, name, interval):
+        low, high = self.bounds[name]
+        return min(max(interval, low), high)
+
+    def due(self):
+        """Источники, которые пора опросить"""
+        now = self.clock()
+        return sorted(name for name, state in self.state.items() if state['next_poll'] <= now)
+
+    def wait_time(self):
+        """Сколько секунд до ближайшего опроса"""
+        if not self.state:
+            return None
+        return max(0.0, min(state['next_poll'] for state in self.state.values()) - self.clock())
+
+    def observe(self, name, new_items):
+        state = self.state[name]
+        if new_items:
+            interval = state['interval'] / self.speedup
+        else:
+            interval = state['interval'] * self.backoff
+        state['interval'] = self._clamp(name, interval)
+        state['next_poll'] = self.clock() + state['interval']
+        state['polls'] += 1
+        state['items'] += new_items
+
+    def save(self):
+        if self.path:
+            atomic_write_json(self.path, self.state, indent=2)
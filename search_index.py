@@ -0,0 +1,306 @@
+# ==========================================
+# Полнотекстовый поиск по записям справочника
+# Инвертированный индекс: слово -> записи, в которых оно встречается
+# ==========================================
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+
+TOKEN_RE = re.compile(r'\w+')
+
+# Совпадение в названии всегда важнее совпадения в тексте
+TITLE_WEIGHT = 10
+CONTENT_WEIGHT = 1
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+class SearchIndex:
+    """Инвертированный индекс с поиском по началу слова.
+
+    Запрос "пит яз" находит записи, где есть слова, начинающиеся с "пит" и с "яз".
+    Поиск стоит O(log V + число подходящих записей) и не зависит от общего
+    количества записей, а индекс обновляется по одной записи при правке.
+
+    Изменения и чтение идут под lock: индекс читает SearchExecutor в своем
+    потоке, а version растет при каждом изменении.
+    """
+
+    def __init__(self):
+        self.postings = {}     # слово -> {id записи: вес}
+        self.vocab = []        # отсортированный словарь для поиска по префиксу
+        self.doc_tokens = {}   # id записи -> ее слова (нужно для удаления)
+        self.lock = threading.RLock()
+        self.version = 0
+
+    def build(self, entries):
+        with self.lock:
+            self.postings = {}
+            self.doc_tokens = {}
+            for entry in entries:
+                self._index(entry)
+            self.vocab = sorted(self.postings)
+            self.version += 1
+
+    def add(self, entry):
+        with self.lock:
+            self._index(entry, keep_vocab=True)
+
+    def update(self, entry):
+        with self.lock:
+            self.remove(entry['id'])
+            self.add(entry)
+
+    def add_content(self, entry_id, text):
+        """Доиндексирует текст записи, которая уже есть в индексе по названию"""
+        with self.lock:
+            self._add_content(entry_id, text)
+
+    def _add_content(self, entry_id, text):
+        self.version += 1
+        tokens = list(self.doc_tokens.get(entry_id, ()))
+        known = set(tokens)
+        for token in set(tokenize(text)):
+            docs = self.postings.get(token)
+            if docs is None:
+                docs = self.postings[token] = {}
+                insort(self.vocab, token)
+            docs[entry_id] = docs.get(entry_id, 0) | CONTENT_WEIGHT
+            if token not in known:
+                tokens.append(token)
+        self.doc_tokens[entry_id] = tuple(tokens)
+
+    def remove(self, entry_id):
+        with self.lock:
+            self._remove(entry_id)
+
+    def _remove(self, entry_id):
+        self.version += 1
+        for token in self.doc_tokens.pop(entry_id, ()):
+            docs = self.postings.get(token)
+            if docs is None:
+                continue
+            docs.pop(entry_id, None)
+            if not docs:
+                del self.postings[token]
+                i = bisect_left(self.vocab, token)
+                if i < len(self.vocab) and self.vocab[i] == token:
+                    del self.vocab[i]
+
+    def _index(self, entry, keep_vocab=False):
+        self.version += 1
+        entry_id = entry['id']
+        weights = {}
+        for token in tokenize(entry.get('title', '')):
+            weights[token] = TITLE_WEIGHT
+        for token in tokenize(entry.get('content', '')):
+            weights[token] = weights.get(token, 0) | CONTENT_WEIGHT
+        for token, weight in weights.items():
+            docs = self.postings.get(token)
+            if docs is None:
+                docs = self.postings[token] = {}
+                if keep_vocab:
+                    insort(self.vocab, token)
+            docs[entry_id] = weight
+        self.doc_tokens[entry_id] = tuple(weights)
+
+    def matches(self, entry_id, query):
+        """Подходит ли одна запись под запрос - по ее собственным словам, без обхода индекса"""
+        prefixes = set(tokenize(query))
+        with self.lock:
+            tokens = self.doc_tokens.get(entry_id, ())
+            return bool(prefixes) and all(any(token.startswith(p) for token in tokens) for p in prefixes)
+
+    def _prefix_matches(self, prefix):
+        """Все слова словаря, начинающиеся с prefix"""
+        i = bisect_left(self.vocab, prefix)
+        while i < len(self.vocab) and self.vocab[i].startswith(prefix):
+            yield self.vocab[i]
+            i += 1
+
+    def search(self, query):
+        """Возвращает id подходящих записей, лучшие совпадения первыми"""
+        with self.lock:
+            return self._search(query)
+
+    def _search(self, query):
+        scores = None
+        for prefix in set(tokenize(query)):
+            # Лучший вес записи по всем словам с этим префиксом
+            best = {}
+            for token in self._prefix_matches(prefix):
+                for entry_id, weight in self.postings[token].items():
+                    if weight > best.get(entry_id, 0):
+                        best[entry_id] = weight
+            if scores is None:
+                scores = best
+            else:
+                # Запись должна подходить под все слова запроса
+                scores = {i: s + best[i] for i, s in scores.items() if i in best}
+            if not scores:
+                return []
+        if scores is None:
+            return []
+        return sorted(scores, key=lambda i: (-scores[i], i))
+
+
+def _ranked(scores):
+    return sorted(scores, key=lambda i: (-scores[i], i))
+
+
+class _SearchTask:
+    def __init__(self, query, on_result):
+        self.query = " ".join(query.lower().split())
+        self.on_result = on_result
+        self.cancelled = False
+
+
+class SearchExecutor:
+    """Поиск в фоновом потоке порциями, с отменой и сужением.
+
+    submit(query, on_result) отменяет предыдущий поиск: поток проверяет
+    отмену после каждой порции из chunk записей. on_result(ids, done)
+    вызывается через dispatch (в приложении - Clock, то есть главный поток)
+    с найденным к этому моменту (лучшие первыми) - не чаще раза в
+    partial_every секунд, и в конце с done=True.
+
+    Если запрос продолжает предыдущий ("py" -> "pyt", "py" -> "py t"), а
+    индекс с тех пор не менялся, проверяются только прошлые результаты: по
+    началу слова каждое слово старого запроса - префикс слова нового.
+    """
+
+    def __init__(self, index, dispatch=None, chunk=500, partial_every=0.1):
+        self.index = index
+        self.dispatch = dispatch or (lambda func: func())
+        self.chunk = chunk
+        self.partial_every = partial_every
+        self._cond = threading.Condition()
+        self._next = None
+        self._current = None
+        self._last = None  # (запрос, версия индекса, найденные id) последнего законченного поиска
+        self._thread = threading.Thread(target=self._run, name="search", daemon=True)
+        self._thread.start()
+
+    def submit(self, query, on_result):
+        task = _SearchTask(query, on_result)
+        with self._cond:
+            self._cancel()
+            self._next = task
+            self._cond.notify()
+        return task
+
+    def cancel(self):
+        with self._cond:
+            self._cancel()
+
+    def _cancel(self):
+        for task in (self._current, self._next):
+            if task is not None:
+                task.cancelled = True
+        self._next = None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._next is None:
+                    self._cond.wait()
+                task, self._next = self._next, None
+                self._current = task
+            try:
+                self._execute(task)
+            except Exception as e:
+                print(f"DEBUG: Ошибка поиска: {e}")
+            with self._cond:
+                self._current = None
+
+    def _deliver(self, task, ids, done):
+        def deliver():
+            # Результат отмененного поиска, пришедший позже нового запроса, не показываем
+            if not task.cancelled:
+                task.on_result(ids, done)
+        self.dispatch(deliver)
+
+    def _execute(self, task):
+        index = self.index
+        prefixes = list(dict.fromkeys(tokenize(task.query)))
+        if not prefixes:
+            self._deliver(task, [], True)
+            return
+        with index.lock:
+            version = index.version
+        last = self._last
+        scores = {}
+        last_sent = time.monotonic()
+        if last is not None and last[1] == version and task.query.startswith(last[0]):
+            candidates = last[2]
+        elif len(prefixes) == 1:
+            # Одно слово: результаты - это сами записи со словами на этот префикс
+            candidates = None
+            with index.lock:
+                tokens = list(index._prefix_matches(prefixes[0]))
+            pending = 0
+            for token in tokens:
+                if task.cancelled:
+                    return
+                with index.lock:
+                    docs = index.postings.get(token)
+                    for entry_id, weight in (docs or {}).items():
+                        if weight > scores.get(entry_id, 0):
+                            scores[entry_id] = weight
+                pending += len(docs or ())
+                if pending >= self.chunk and time.monotonic() - last_sent >= self.partial_every:
+                    self._deliver(task, _ranked(scores), False)
+                    last_sent, pending = time.monotonic(), 0
+        else:
+            # Кандидаты - записи с самым длинным (самым редким) словом запроса
+            rare = max(prefixes, key=len)
+            with index.lock:
+                tokens = list(index._prefix_matches(rare))
+            found = {}
+            for token in tokens:
+                if task.cancelled:
+                    return
+                with index.lock:
+                    found.update(dict.fromkeys(index.postings.get(token) or ()))
+            candidates = list(found)
+
+        if candidates is not None:
+            for start in range(0, len(candidates), self.chunk):
+                if task.cancelled:
+                    return
+                with index.lock:
+                    for entry_id in candidates[start:start + self.chunk]:
+                        score = self._score(entry_id, prefixes)
+                        if score:
+                            scores[entry_id] = score
+                if time.monotonic() - last_sent >= self.partial_every:
+                    self._deliver(task, _ranked(scores), False)
+                    last_sent = time.monotonic()
+
+        if task.cancelled:
+            return
+        ids = _ranked(scores)
+        with index.lock:
+            if index.version == version:
+                self._last = (task.query, version, ids)
+        self._deliver(task, ids, True)
+
+    def _score(self, entry_id, prefixes):
+        """Вес записи для запроса или 0, если подходят не все слова (под lock индекса)"""
+        index = self.index
+        tokens = index.doc_tokens.get(entry_id, ())
+        total = 0
+        for prefix in prefixes:
+            best = 0
+            for token in tokens:
+                if token.startswith(prefix):
+                    weight = index.postings[token].get(entry_id, 0)
+                    if weight > best:
+                        best = weight
+            if not best:
+                return 0
+            total += best
+        return total
@@ -0,0 +1,165 @@
+# ==========================================
+# Источники новостей для парсера
+# Чтобы добавить новый сайт, достаточно описать класс-наследник Source
+# и пометить его декоратором @register_source
+# ==========================================
+from datetime import datetime
+from itertools import islice
+from urllib.parse import urljoin
+
+
+# Реестр источников: имя -> класс
+SOURCES = {}
+
+
+def register_source(cls):
+    SOURCES[cls.name] = cls
+    return cls
+
+
+class Source:
+    """Базовый источник: страница-список, из которой берутся новые записи.
+
+    items() - генератор: скачивает список, выбирает строки через extract(),
+    отбрасывает уже известные и, если deep=True, заходит внутрь статей.
+    Статьи, которые не скачались, уходят в parser.retry_queue и в следующих
+    запусках пробуются снова, даже если страница-список не изменилась.
+    ETag страницы запоминается в finish(), который пайплайн вызывает только
+    после того, как все записи источника сохранены.
+
+    Страницу-список разбирает либо extract(html), либо (если задан listing)
+    разборщик из extract.EXTRACTORS - его парсер может выполнить в пуле
+    процессов, а make_row() потом превращает его строки в строки источника.
+    """
+    name = ""
+    url = ""
+    category = ""
+    limit = 10     # сколько позиций списка смотреть за запуск
+    deep = False   # заходить ли внутрь статей за текстом
+    timeout = 120  # секунд на весь источник, после этого его результаты не ждем
+    poll_interval = 3600  # начальный интервал опроса в режиме демона (parser.py --daemon), сек
+    listing = None  # имя разборщика списка в extract.EXTRACTORS
+
+    def __init__(self, parser):
+        self.parser = parser
+        self._validators = None
+
+    def items(self):
+        metrics = self.parser.metrics
+        retry_queue = self.parser.retry_queue
+        self.parser.load_known()
+        # Сначала статьи, которые не скачались в прошлые запуски
+        rows = retry_queue.due(self.name) if self.deep else []
+
+        with metrics.stage("fetch.listing"):
+            res = self.parser.session.get(self.url, conditional=True)
+        if res.status_code == 304:
+            metrics.incr("listing.not_modified")
+            print(f"  [{self.name}] страница не изменилась с прошлого запуска")
+            listing = []
+        else:
+            res.raise_for_status()
+            with metrics.stage("parse.listing"):
+                listing = list(islice(self.parse_listing(res), self.limit))
+
+        queued = {row['url'] for row in rows}
+        for row in listing:
+            if row['url'] in queued:
+                continue
+            if row['url'] in retry_queue:
+                # Статья ждет повтора, но ее время еще не пришло - пауза не обходится
+                metrics.incr("retry_queue.waiting")
+                continue
+            if self.parser.is_known(row['url'], row['title']):
+                print(f"  [{self.name}] пропуск: {row['title']} уже есть")
+            else:
+                rows.append(row)
+
+        if self.deep:
+            # Статьи качаются параллельно, но отдаются в порядке списка
+            contents = self.parser.iter_articles(row['url'] for row in rows)
+        else:
+            contents = (None for _ in rows)
+        for row, content in zip(rows, contents):
+            if self.deep and content is None:
+                error = self.parser.article_errors.pop(row['url'], "не удалось скачать")
+                if retry_queue.add(self.name, row, error):
+                    metrics.incr("retry_queue.added")
+                    print(f"  [{self.name}] отложено до следующего запуска: {row['title']}")
+                else:
+                    metrics.incr("retry_queue.dropped")
+                    print(f"  [{self.name}] попытки исчерпаны: {row['title']}")
+                continue
+            if row['url'] in queued:
+                metrics.incr("retry_queue.recovered")
+                retry_queue.discard(row['url'])
+            yield self.make_item(row, content)
+        if res.status_code != 304:
+            self._validators = (self.url, res)
+
+    def finish(self):
+        if self._validators:
+            self.parser.session.remember(*self._validators)
+
+    def parse_listing(self, res):
+        """Строки списка из ответа: через разборщик listing (возможно, в другом процессе) или extract()"""
+        if self.listing is None:
+            return self.extract(res.text)
+        return map(self.make_row, self.parser.extract_page(self.listing, res.content, res.encoding))
+
+    def extract(self, html):
+        """Генератор строк списка: словари с title, url и (необязательно) date"""
+        raise NotImplementedError
+
+    def make_row(self, row):
+        """Строка разборщика listing -> строка источника (title, url, date)"""
+        raise NotImplementedError
+
+    def make_item(self, row, content):
+        """Превращает строку списка в запись справочника"""
+        raise NotImplementedError
+
+
+@register_source
+class PythonOrgSource(Source):
+    """Блог Python.org, с заходом внутрь статей"""
+    name = "python_org"
+    url = "https://www.python.org/blogs/"
+    category = "Язык Программирование"
+    limit = 5  # Берем только последние 5 новостей за раз, чтобы не нагружать сайт
+    deep = True
+    poll_interval = 4 * 3600  # блог пополняется несколько раз в неделю
+    listing = "python_org"
+
+    def make_row(self, row):
+        return {"title": row['title'], "url": urljoin(self.url, row['href']), "date": row['date']}
+
+    def make_item(self, row, content):
+        return {
+            "title": row['title'],
+            "category": self.category,
+            "content": f"{content}\n\nПолный источник: {row['url']}",
+            "date": row['date'],
+        }
+
+
+@register_source
+class HackerNewsSource(Source):
+    """Главная страница Hacker News, только заголовки и ссылки"""
+    name = "hacker_news"
+    url = "https://news.ycombinator.com/"
+    category = "Новости IT"
+    limit = 10
+    poll_interval = 15 * 60  # главная HN меняется за минуты
+    listing = "hacker_news"
+
+    def make_row(self, row):
+        return {"title": row['title'], "url": urljoin(self.url, row['href'])}
+
+    def make_item(self, row, content):
+        return {
+            "title": row['title'],
+            "category": self.category,
+            "content": f"Популярное обсуждение на Hacker News.\n\nСсылка на источник: {row['url']}",
+            "date": datetime.now().strftime("%Y-%m-%d"),
+        }
@@ -0,0 +1,779 @@
+# ==========================================
+# Хранилище записей справочника (общее для parser.py и main.py)
+# data.json - базовый снимок в старом формате, изменения дописываются в журнал.
+# Для быстрого старта рядом лежат двоичный индекс (id, title, category, date)
+# и файл содержимого, из которого тексты читаются по смещению через mmap
+# ==========================================
+import hashlib
+import json
+import marshal
+import mmap
+import os
+import struct
+import sys
+import threading
+import zlib
+from collections.abc import Mapping
+from functools import partial
+from itertools import chain
+
+from archive import MonthArchive
+from persist import atomic_write
+from sync import shard_key
+
+INDEX_VERSION = 5
+INDEX_MAGIC = b"NSIX"
+# Записей в одном блоке индекса: блок - один вызов marshal.loads
+INDEX_BLOCK = 256
+_BLOCK_SIZE = struct.Struct('<I')
+# Тексты длиннее стольких байт хранятся в файле содержимого сжатыми (zlib)
+COMPRESS_MIN = 512
+_RAW, _ZLIB = b"\x00", b"\x01"
+
+# Поля, которые есть у каждой записи и хранятся в слотах Entry
+ENTRY_FIELDS = ('id', 'title', 'category', 'date')
+# Общие кортежи порядка ключей: у тысяч записей он один и тот же
+_KEY_ORDERS = {}
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Entry(Mapping):
+    """Запись без content в компактном виде.
+
+    Вместо словаря на каждую запись - объект со __slots__, а повторяющиеся
+    строки (категория, дата) интернируются и хранятся в одном экземпляре.
+    Снаружи запись читается как словарь: entry['title'], entry.get(...),
+    dict(entry); порядок ключей сохраняется, чтобы data.json не менялся.
+    """
+
+    __slots__ = ('id', 'title', 'category', 'date', '_keys', '_extra', '_offset', '_length')
+
+    # Поля записи; _offset/_length - положение текста в файле содержимого, их ведет EntryStore
+    _DATA_SLOTS = ('id', 'title', 'category', 'date', '_keys', '_extra')
+
+    def __init__(self, data):
+        keys = tuple(data)
+        self._keys = _KEY_ORDERS.setdefault(keys, keys)
+        self.id = data.get('id')
+        self.title = data.get('title')
+        self.category = _intern(data.get('category'))
+        self.date = _intern(data.get('date'))
+        # Редкие нестандартные поля (если кто-то добавил их в data.json)
+        self._extra = {k: v for k, v in data.items() if k not in ENTRY_FIELDS} or None
+        self._offset = self._length = None
+
+    def __getitem__(self, key):
+        if key not in self._keys:
+            raise KeyError(key)
+        if key in ENTRY_FIELDS:
+            return getattr(self, key)
+        return self._extra[key]
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __repr__(self):
+        return f"Entry({dict(self)!r})"
+
+    def assign(self, other):
+        """Переписывает поля значениями другой записи (правка на месте)"""
+        for name in Entry._DATA_SLOTS:
+            setattr(self, name, getattr(other, name))
+
+    def copy(self):
+        entry = Entry.__new__(Entry)
+        entry.assign(self)
+        entry._offset, entry._length = self._offset, self._length
+        return entry
+
+
+def split_entry(entry):
+    """Делит запись на часть для индекса (Entry, все, кроме content) и текст"""
+    return Entry({k: v for k, v in entry.items() if k != 'content'}), entry.get('content', "")
+
+
+def join_entry(light, content):
+    """Собирает запись обратно в старом формате (content сразу после category)"""
+    entry = {}
+    for key, value in light.items():
+        entry[key] = value
+        if key == 'category':
+            entry['content'] = content
+    if 'content' not in entry:
+        entry['content'] = content
+    return entry
+
+
+def _op_id(op):
+    """id записи, которую меняет операция журнала"""
+    return op['entry']['id'] if op['op'] == 'put' else op['id']
+
+
+def _file_stamp(path):
+    """Отпечаток файла для проверки, что индекс построен именно по нему"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def pack_text(text):
+    """Текст для файла содержимого: байт формата + utf-8 (длинные тексты - через zlib)"""
+    if not text:
+        return b""
+    data = text.encode('utf-8')
+    if len(data) >= COMPRESS_MIN:
+        packed = zlib.compress(data, 6)
+        if len(packed) < len(data):
+            return _ZLIB + packed
+    return _RAW + data
+
+
+def unpack_text(blob):
+    if not blob:
+        return ""
+    data = blob[1:]
+    if blob[:1] == _ZLIB:
+        data = zlib.decompress(data)
+    return data.decode('utf-8')
+
+
+def _file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_block(f, obj):
+    data = marshal.dumps(obj)
+    f.write(_BLOCK_SIZE.pack(len(data)))
+    f.write(data)
+
+
+def _read_block(f):
+    head = f.read(_BLOCK_SIZE.size)
+    if not head:
+        return None
+    (size,) = _BLOCK_SIZE.unpack(head)
+    data = f.read(size)
+    if len(data) != size:
+        raise EOFError("индекс обрезан")
+    return marshal.loads(data)
+
+
+class EntryStore:
+    """Записи справочника: снимок data.json + журнал изменений (JSONL).
+
+    Каждое добавление, правка или удаление дописывает одну строку в журнал,
+    а не переписывает весь файл. Когда журнал разрастается, он в фоне
+    сворачивается (compact) обратно в data.json, который остается в прежнем
+    формате и используется для синхронизации через GitHub.
+
+    В памяти держатся только записи без content (Entry). Тексты лежат в отдельном
+    файле (data.content.N.bin, длинные - сжатые zlib) и читаются по требованию
+    через content(id); смещения хранятся в двоичном индексе data.index.bin. Индекс и файл
+    содержимого - производные от data.json: если data.json поменяли снаружи
+    (git pull, новая версия приложения), они строятся заново. JSON остается
+    только форматом обмена, при запуске он не разбирается.
+
+    Старые месяцы можно убрать в архив (archive_old): тогда data.json и
+    индекс содержат только последние месяцы, а архивные подгружаются по
+    одному через page_in() и живут только в памяти, пока их не изменят.
+    """
+
+    def __init__(self, path="data.json", journal_path=None, compact_every=200, writer=None, archive_dir=None):
+        base = os.path.splitext(path)[0]
+        self.path = path
+        self.journal_path = journal_path or base + ".journal.jsonl"
+        self.index_path = base + ".index.bin"
+        self._content_base = base + ".content"
+        # После скольких записей в журнале запускать фоновое сжатие
+        self.compact_every = compact_every
+        self.entries = {}   # id -> Entry (запись без content), в порядке добавления
+        self._pending = {}  # id -> текст, которого еще нет в файле содержимого
+        # Наибольший выданный id; удаленные id повторно не выдаются
+        self._last_id = 0
+        self._generation = 0
+        self._content_fh = None
+        self._mm = None
+        self.lock = threading.RLock()
+        self._journal_ops = 0
+        self._compact_thread = None
+        # Новое поколение снимка пишет только один поток: сжатие или архивация
+        self._snapshot_lock = threading.Lock()
+        # Фоновый писатель (persist.WriteBehind): строки журнала копятся в буфере
+        # и дописываются в его потоке. Без писателя журнал пишется сразу.
+        self.writer = writer
+        self._journal_buffer = []
+        self._journal_epoch = 0
+        self._flush_lock = threading.Lock()  # строки журнала дописываются строго по порядку
+        # Сжатые помесячные файлы со старыми записями
+        self.archive = MonthArchive(archive_dir or os.path.join(os.path.dirname(path), "archive"))
+        self._archived = {}       # id -> месяц для записей, подгруженных из архива
+        self.paged_months = []    # подгруженные месяцы архива, по порядку подгрузки
+
+    def exists(self):
+        return os.path.exists(self.path) or os.path.exists(self.journal_path)
+
+    # ------------------------------------------
+    # Чтение
+    # ------------------------------------------
+    def load(self):
+        """Читает индекс (или data.json, если индекс устарел) и применяет журнал.
+
+        Возвращает записи без content - текст читается через content(id).
+        """
+        self._flush_journal()
+        self.wait()
+        with self.lock:
+            self._close_content()
+            self.entries, self._pending = {}, {}
+            self._archived, self.paged_months = {}, []
+            self._last_id = 0
+            if not self._load_index():
+                self._import_legacy()
+            self._journal_ops = 0
+            if os.path.exists(self.journal_path):
+                with open(self.journal_path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            op = json.loads(line)
+                        except ValueError:
+                            # Оборванная последняя строка (например, приложение закрыли при записи)
+                            break
+                        self._apply(op)
+                        self._journal_ops += 1
+            return self.all()
+
+    def all(self):
+        with self.lock:
+            return list(self.entries.values())
+
+    def get(self, entry_id):
+        return self.entries.get(entry_id)
+
+    def content(self, entry_id):
+        """Текст записи: из еще не сжатых изменений или из файла содержимого"""
+        with self.lock:
+            text = self._pending.get(entry_id)
+            if text is not None:
+                return text
+            entry = self.entries.get(entry_id)
+            if entry is None or entry._offset is None or self._mm is None:
+                return ""
+            return unpack_text(self._mm[entry._offset:entry._offset + entry._length])
+
+    def full(self, entry_id):
+        """Запись целиком, в формате data.json"""
+        with self.lock:
+            light = self.entries.get(entry_id)
+            if light is None:
+                return None
+            return join_entry(light, self.content(entry_id))
+
+    def iter_full(self):
+        """Все записи целиком; тексты читаются по одному"""
+        for entry_id in list(self.entries):
+            entry = self.full(entry_id)
+            if entry is not None:
+                yield entry
+
+    def next_id(self):
+        with self.lock:
+            return self._last_id + 1
+
+    # ------------------------------------------
+    # Изменения
+    # ------------------------------------------
+    def put(self, entry):
+        """Добавляет новую или сохраняет измененную запись.
+
+        Если в entry нет content, текст записи остается прежним.
+        """
+        self._append([{"op": "put", "entry": entry}])
+
+    def put_many(self, entries):
+        self._append([{"op": "put", "entry": entry} for entry in entries])
+
+    def delete(self, entry_id):
+        self._append([{"op": "del", "id": entry_id}])
+
+    def replace_all(self, entries):
+        """Полная замена содержимого (например, после синхронизации)"""
+        self.wait()
+        with self.lock:
+            records = []
+            for entry in entries:
+                light, text = split_entry(entry)
+                records.append((light, text))
+            self._rebuild(records, write_legacy=True)
+            self._archived, self.paged_months = {}, []
+            self._reset_journal()
+
+    def _reset_journal(self):
+        # Недописанные строки журнала относятся к старому содержимому
+        self._journal_buffer = []
+        self._journal_epoch += 1
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self._journal_ops = 0
+
+    # ------------------------------------------
+    # Архив старых месяцев
+    # ------------------------------------------
+    def archive_months(self):
+        """Месяцы архива, которые еще не подгружены, от новых к старым"""
+        return [month for month in self.archive.months() if month not in self.paged_months]
+
+    def page_in(self, month):
+        """Подгружает месяц из архива; возвращает добавленные записи (Entry).
+
+        Записи встают перед остальными (порядок по времени сохраняется) и в
+        журнал и data.json не попадают, пока их не изменят.
+        """
+        entries = self.archive.load(month)
+        with self.lock:
+            if month in self.paged_months:
+                return []
+            self.paged_months.append(month)
+            added = []
+            for entry in entries:
+                if entry['id'] in self.entries:
+                    # Запись уже правили после архивации - живая копия главнее
+                    continue
+                light, text = split_entry(entry)
+                self._pending[light.id] = text
+                self._archived[light.id] = month
+                self._last_id = max(self._last_id, light.id)
+                added.append(light)
+            if added:
+                entries = {light.id: light for light in added}
+                entries.update(self.entries)
+                self.entries = entries
+            return added
+
+    def page_out(self, months):
+        """Выгружает подгруженные месяцы архива из памяти; возвращает id убранных записей.
+
+        Записи, которые правили после подгрузки, уже живые и остаются.
+        """
+        months = set(months)
+        with self.lock:
+            gone = [entry_id for entry_id, month in self._archived.items() if month in months]
+            for entry_id in gone:
+                del self._archived[entry_id]
+                self.entries.pop(entry_id, None)
+                self._pending.pop(entry_id, None)
+            self.paged_months = [month for month in self.paged_months if month not in months]
+            return gone
+
+    def delete_archived(self, entry_ids, month=None):
+        """Удаляет из архива записи, которых нет в памяти (month=None - из всех месяцев).
+
+        Подгруженные записи удаляются обычным delete.
+        """
+        months = self.archive.months()
+        for archived in months if month is None else [month]:
+            if archived in months:
+                self._archive_remove(archived, entry_ids)
+
+    def archive_old(self, keep_months):
+        """Убирает в архив месяцы, кроме keep_months последних.
+
+        data.json, индекс и файл содержимого пересобираются без них.
+        Возвращает id записей, которые ушли из памяти (вместе с
+        подгруженными из архива раньше), или [], если переносить нечего.
+
+        Как и compact, файлы пишутся без блокировки, поэтому вызывать можно
+        из фонового потока: правки, сделанные за это время, остаются в
+        журнале, а затронутые ими записи - в памяти.
+        """
+        self._flush_journal()
+        self.wait()
+        with self._snapshot_lock:
+            with self.lock:
+                live = [light for entry_id, light in self.entries.items() if entry_id not in self._archived]
+                months = sorted({shard_key(light) for light in live} - {"misc"})
+                old = set(months[:-keep_months] if keep_months > 0 else months)
+                if not old:
+                    return []
+                moved = {light.id: self.full(light.id) for light in live if shard_key(light) in old}
+                paged, paged_months = list(self._archived), list(self.paged_months)
+                records = [
+                    (light.copy(), self._pending.get(light.id))
+                    for light in live if light.id not in moved
+                ]
+                last_id = self._last_id
+                offset = self._journal_size()
+                source = self._mm
+            self.archive.add(list(moved.values()))
+            generation, lights = self._write_snapshot(records, write_legacy=True, source=source)
+            with self.lock:
+                tail = self._journal_tail(offset)
+                touched = {_op_id(op) for op in chain(map(json.loads, tail.splitlines()), self._journal_buffer)}
+                self._install_snapshot(generation, lights, write_legacy=True, last_id=last_id)
+                self._adopt_snapshot(records)
+                gone = []
+                for entry_id in chain(moved, paged):
+                    if entry_id in touched:
+                        if entry_id in moved and entry_id not in self.entries:
+                            # Удалена, пока шла архивация: убираем и из архива
+                            self._archive_remove(shard_key(moved[entry_id]), [entry_id])
+                        continue
+                    if entry_id in self.entries:
+                        gone.append(entry_id)
+                    self._pending.pop(entry_id, None)
+                    self._archived.pop(entry_id, None)
+                # Словарь подменяется целиком, как в page_in: главный поток может
+                # в это время перебирать старый
+                dropped = set(gone)
+                self.entries = {entry_id: light for entry_id, light in self.entries.items() if entry_id not in dropped}
+                self.paged_months = [month for month in self.paged_months if month not in paged_months]
+                self._replace_journal(tail)
+                return gone
+
+    def _archive_remove(self, month, entry_ids):
+        """Убирает записи из файла месяца в архиве: сразу или в потоке писателя"""
+        remove = partial(self.archive.remove, month, entry_ids)
+        if self.writer is None:
+            remove()
+        else:
+            self.writer.schedule(("archive", month, tuple(entry_ids)), remove)
+
+    def _apply(self, op):
+        if op['op'] == 'put':
+            light, text = split_entry(op['entry'])
+            entry_id = light.id
+            current = self.entries.get(entry_id)
+            # Измененная запись из архива снова живая: попадет в data.json при сжатии
+            self._archived.pop(entry_id, None)
+            if current is not None:
+                # Правим на месте, чтобы ссылки на запись у вызывающего оставались актуальными
+                current.assign(light)
+            else:
+                self.entries[entry_id] = light
+                if entry_id > self._last_id:
+                    self._last_id = entry_id
+            self._pending[entry_id] = text
+        elif op['op'] == 'del':
+            self.entries.pop(op['id'], None)
+            self._pending.pop(op['id'], None)
+            month = self._archived.pop(op['id'], None)
+            if month is not None:
+                # Иначе запись вернется при следующей подгрузке месяца
+                self._archive_remove(month, [op['id']])
+
+    def _append(self, ops):
+        if not ops:
+            return
+        with self.lock:
+            for op in ops:
+                if op['op'] == 'put' and 'content' not in op['entry']:
+                    # В журнал всегда пишется запись целиком, иначе при чтении текст потеряется
+                    op['entry'] = dict(op['entry'], content=self.content(op['entry']['id']))
+                self._apply(op)
+            if self.writer is None:
+                self._write_journal("".join(json.dumps(op, ensure_ascii=False) + "\n" for op in ops))
+            else:
+                self._journal_buffer.extend(ops)
+                self.writer.schedule(self.journal_path, self._flush_journal)
+            self._journal_ops += len(ops)
+            need_compact = self._journal_ops >= self.compact_every
+        if need_compact:
+            self.compact(background=True)
+
+    def _write_journal(self, text):
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write(text)
+
+    def _flush_journal(self):
+        """Дописывает накопленные строки журнала (в потоке писателя или при закрытии)"""
+        with self._flush_lock:
+            with self.lock:
+                ops, self._journal_buffer = self._journal_buffer, []
+                epoch = self._journal_epoch
+            if not ops:
+                return
+            # JSON готовится без блокировки, чтобы не задерживать главный поток
+            text = "".join(json.dumps(op, ensure_ascii=False) + "\n" for op in ops)
+            with self.lock:
+                if epoch == self._journal_epoch:
+                    self._write_journal(text)
+
+    # ------------------------------------------
+    # Индекс и файл содержимого
+    # ------------------------------------------
+    def _content_path(self, generation):
+        return f"{self._content_base}.{generation}.bin"
+
+    def _read_index(self, limit=None):
+        """Читает индекс: (заголовок, [Entry]) или None, если он устарел или испорчен.
+
+        Формат: метка INDEX_MAGIC, заголовок и блоки по INDEX_BLOCK записей
+        [(поля, смещение, длина)], каждый - длина + marshal. Записи лежат от
+        новых к старым, а блоки читаются по порядку, поэтому свежие записи
+        можно прочитать, не разбирая весь файл. Индекс годен, если совпадают mtime и размер data.json, а если
+        mtime другой (git checkout, копирование) - если совпадает хэш.
+        """
+        entries = []
+        try:
+            with open(self.index_path, 'rb') as f:
+                if f.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+                    return None
+                header = _read_block(f)
+                if header.get('version') != INDEX_VERSION:
+                    return None
+                stamp = _file_stamp(self.path)
+                if stamp != header['stamp']:
+                    if stamp is None or stamp[1] != header['stamp'][1] or _file_hash(self.path) != header['sha1']:
+                        return None
+                    header['stamp'] = stamp
+                    header['restamp'] = True
+                if not os.path.exists(self._content_path(header['generation'])):
+                    return None
+                while limit is None or len(entries) < limit:
+                    block = _read_block(f)
+                    if block is None:
+                        break
+                    for data, offset, length in block:
+                        light = Entry(data)
+                        light._offset, light._length = offset, length
+                        entries.append(light)
+        except (OSError, ValueError, EOFError, KeyError, TypeError):
+            return None
+        return header, entries[:limit]
+
+    def _write_index(self, header, lights):
+        """Пишет индекс; lights - в порядке хранилища (от старых к новым)"""
+        lights = lights[::-1]
+        tmp = self.index_path + ".tmp"
+        with open(tmp, 'wb') as f:
+            f.write(INDEX_MAGIC)
+            _write_block(f, header)
+            for start in range(0, len(lights), INDEX_BLOCK):
+                _write_block(f, [
+                    (dict(light), light._offset, light._length)
+                    for light in lights[start:start + INDEX_BLOCK]
+                ])
+        os.replace(tmp, self.index_path)
+
+    def _load_index(self):
+        """Загружает компактный индекс, если он построен по текущему data.json"""
+        index = self._read_index()
+        if index is None:
+            return False
+        header, entries = index
+        entries.reverse()
+        self.entries = {light.id: light for light in entries}
+        self._last_id = max(header.get('last_id', 0), max(self.entries, default=0))
+        if header.pop('restamp', False):
+            # data.json тот же, изменилось только время - запоминаем его, чтобы не хэшировать снова
+            self._write_index(header, entries)
+        self._open_content(header['generation'])
+        return True
+
+    def peek(self, count):
+        """count самых новых записей без полной загрузки (для первого экрана).
+
+        Журнал не применяется, так что правки последних минут могут быть не
+        видны до load(). Если индекса еще нет, возвращает пустой список.
+        """
+        index = self._read_index(limit=count)
+        return index[1] if index else []
+
+    def _import_legacy(self):
+        """Строит индекс и файл содержимого из data.json"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        records = []
+        for entry in data:
+            light, text = split_entry(entry)
+            records.append((light, text))
+        del data
+        self._rebuild(records, write_legacy=False)
+
+    def _rebuild(self, records, write_legacy, source=None, last_id=0):
+        """Полностью пересобирает снимок из записей с текстами (под блокировкой)"""
+        generation, lights = self._write_snapshot(records, write_legacy, source)
+        self._last_id = max(last_id, max((light.id for light in lights), default=0))
+        self._install_snapshot(generation, lights, write_legacy, self._last_id)
+        self.entries = {light.id: light for light in lights}
+        self._pending = {}
+
+    def _write_snapshot(self, records, write_legacy, source=None):
+        """Пишет новое поколение файла содержимого, индекс и (по желанию) data.json.
+
+        records - список (Entry, текст или None); если текста нет, он берется
+        из текущего файла содержимого (source) по старому положению записи.
+        Новое положение записывается в те же Entry из records.
+        Вызывается под блокировкой, кроме фонового сжатия.
+        """
+        generation = self._generation + 1
+        content_path = self._content_path(generation)
+        legacy = open(self.path + ".tmp", 'w', encoding='utf-8') if write_legacy else None
+        try:
+            with open(content_path + ".tmp", 'wb') as out:
+                position = 0
+                for n, (light, text) in enumerate(records):
+                    if text is not None:
+                        data = pack_text(text)
+                    elif light._offset is not None and source is not None:
+                        data = source[light._offset:light._offset + light._length]
+                    else:
+                        data = b""
+                    out.write(data)
+                    light._offset, light._length = position, len(data)
+                    position += len(data)
+                    if legacy is not None:
+                        # Тот же вывод, что json.dump(список, indent=2), но по одной записи
+                        full = join_entry(light, text if text is not None else unpack_text(data))
+                        chunk = json.dumps(full, ensure_ascii=False, indent=2).replace("\n", "\n  ")
+                        legacy.write(("[\n  " if n == 0 else ",\n  ") + chunk)
+            if legacy is not None:
+                legacy.write("\n]" if records else "[]")
+                legacy.close()
+        except BaseException:
+            if legacy is not None:
+                legacy.close()
+            raise
+        return generation, [light for light, _ in records]
+
+    def _install_snapshot(self, generation, lights, write_legacy, last_id):
+        """Подменяет файлы снимка и переключает чтение текстов на новое поколение"""
+        if write_legacy:
+            os.replace(self.path + ".tmp", self.path)
+        content_path = self._content_path(generation)
+        os.replace(content_path + ".tmp", content_path)
+        header = {
+            "version": INDEX_VERSION,
+            "generation": generation,
+            "last_id": last_id,
+            "stamp": _file_stamp(self.path),
+            "sha1": _file_hash(self.path),
+        }
+        self._write_index(header, lights)
+        old_generation = self._generation
+        self._close_content()
+        self._open_content(generation)
+        if old_generation and old_generation != generation:
+            try:
+                os.remove(self._content_path(old_generation))
+            except OSError:
+                # В Windows файл, открытый в другом процессе, удалить нельзя - не страшно
+                pass
+
+    def _open_content(self, generation):
+        self._generation = generation
+        path = self._content_path(generation)
+        if os.path.getsize(path) == 0:
+            # mmap не умеет отображать пустой файл
+            return
+        self._content_fh = open(path, 'rb')
+        self._mm = mmap.mmap(self._content_fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _close_content(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._content_fh is not None:
+            self._content_fh.close()
+            self._content_fh = None
+
+    # ------------------------------------------
+    # Сжатие журнала
+    # ------------------------------------------
+    def compact(self, background=False):
+        """Сворачивает журнал в data.json, индекс и файл содержимого.
+
+        Снимок пишется во временные файлы без блокировки, так что изменения,
+        сделанные во время сжатия, просто остаются в журнале.
+        """
+        if background:
+            with self.lock:
+                if self._compact_thread and self._compact_thread.is_alive():
+                    return
+                self._compact_thread = threading.Thread(target=self._compact, daemon=True)
+                self._compact_thread.start()
+        else:
+            self.wait()
+            self._compact()
+
+    def _compact(self):
+        with self._snapshot_lock:
+            with self.lock:
+                # Подгруженные из архива записи остаются в архиве
+                records = [
+                    (light.copy(), self._pending.get(entry_id))
+                    for entry_id, light in self.entries.items()
+                    if entry_id not in self._archived
+                ]
+                last_id = self._last_id
+                offset = self._journal_size()
+                # Старое отображение не закрывается до _install_snapshot, читать из него можно без блокировки
+                source = self._mm
+            generation, lights = self._write_snapshot(records, write_legacy=True, source=source)
+            with self.lock:
+                # Все, что успели дописать в журнал за время сжатия, переносим в новый журнал
+                tail = self._journal_tail(offset)
+                self._install_snapshot(generation, lights, write_legacy=True, last_id=last_id)
+                self._adopt_snapshot(records)
+                self._replace_journal(tail)
+
+    def _journal_size(self):
+        return os.path.getsize(self.journal_path) if os.path.exists(self.journal_path) else 0
+
+    def _journal_tail(self, offset):
+        """Строки журнала, дописанные после offset (пока писался снимок)"""
+        if not os.path.exists(self.journal_path):
+            return ""
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            f.seek(offset)
+            return f.read()
+
+    def _adopt_snapshot(self, records):
+        """Переводит записи из снимка на чтение из нового файла содержимого"""
+        for light, text in records:
+            entry_id = light.id
+            current = self.entries.get(entry_id)
+            if current is None:
+                continue
+            current._offset, current._length = light._offset, light._length
+            if text is not None and self._pending.get(entry_id) is text:
+                # Текст не меняли за время сжатия - теперь он читается из файла
+                del self._pending[entry_id]
+
+    def _replace_journal(self, tail):
+        if tail:
+            self._write_text(self.journal_path, tail)
+        elif os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self._journal_ops = tail.count("\n")
+
+    def wait(self):
+        """Дожидается окончания фонового сжатия"""
+        thread = self._compact_thread
+        if thread and thread is not threading.current_thread():
+            thread.join()
+
+    def close(self):
+        self._flush_journal()
+        self.wait()
+        with self.lock:
+            self._close_content()
+
+    def _write_text(self, path, text):
+        atomic_write(path, text)
@@ -0,0 +1,293 @@
+# ==========================================
+# Дельта-синхронизация справочника
+# Парсер публикует manifest.json и помесячные шарды, приложение
+# скачивает только изменившиеся шарды и сливает их с локальными правками
+# ==========================================
+import hashlib
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+
+from persist import atomic_write, atomic_write_json
+
+MANIFEST_FILE = "manifest.json"
+SHARDS_DIR = "shards"
+# Старый полный файл: используется, если на сервере еще нет manifest.json
+LEGACY_FILE = "data.json"
+
+
+def shard_key(entry):
+    """Шард записи - месяц из ее даты (2026-08), записи без даты идут в misc"""
+    date = str(entry.get('date') or '')
+    return date[:7] if len(date) >= 7 and date[4] == '-' else "misc"
+
+
+def _shard_bytes(entries):
+    data = sorted(entries, key=lambda e: e['id'])
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _sha1(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+# ------------------------------------------
+# Публикация (parser.py)
+# ------------------------------------------
+def publish_shards(entries, out_dir=".", frozen=()):
+    """Раскладывает записи по шардам и обновляет manifest.json.
+
+    Перезаписываются только шарды, у которых изменился хэш, поэтому
+    ежедневный запуск парсера трогает в основном шард текущего месяца.
+    Шарды месяцев из frozen (ушедших в архив, их записей нет в entries)
+    остаются как были опубликованы.
+    """
+    shards_path = os.path.join(out_dir, SHARDS_DIR)
+    manifest_path = os.path.join(out_dir, MANIFEST_FILE)
+    os.makedirs(shards_path, exist_ok=True)
+
+    old = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            old = json.load(f)
+    old_shards = old.get('shards', {})
+
+    groups = {}
+    for entry in entries:
+        groups.setdefault(shard_key(entry), []).append(entry)
+
+    shards = {key: old_shards[key] for key in frozen if key in old_shards and key not in groups}
+    changed = False
+    for key in sorted(groups):
+        data = _shard_bytes(groups[key])
+        digest = _sha1(data)
+        ids = [e['id'] for e in groups[key]]
+        shards[key] = {
+            "file": f"{SHARDS_DIR}/{key}.json",
+            "hash": digest,
+            "count": len(ids),
+            "min_id": min(ids),
+            "max_id": max(ids),
+        }
+        if old_shards.get(key, {}).get('hash') != digest:
+            changed = True
+            atomic_write(os.path.join(shards_path, key + ".json"), data)
+
+    for key in set(old_shards) - set(shards):
+        changed = True
+        path = os.path.join(shards_path, key + ".json")
+        if os.path.exists(path):
+            os.remove(path)
+
+    manifest = {
+        "version": old.get('version', 0) + (1 if changed or not old else 0),
+        "high_water": max((s['max_id'] for s in shards.values()), default=0),
+        "total": sum(s['count'] for s in shards.values()),
+        "shards": dict(sorted(shards.items())),
+    }
+    atomic_write_json(manifest_path, manifest, indent=2)
+    return manifest
+
+
+# ------------------------------------------
+# Загрузка и слияние (main.py)
+# ------------------------------------------
+def http_fetch(url, timeout=15):
+    request = urllib.request.Request(url, headers={'User-Agent': 'KivyMD-App'})
+    with urllib.request.urlopen(request, timeout=timeout) as res:
+        return res.read()
+
+
+class DeltaSyncClient:
+    """Клиент дельта-синхронизации.
+
+    fetch_changes() только качает и разбирает данные (можно вызывать в
+    фоновом потоке), merge() применяет их к EntryStore. Локальные правки
+    записываются через note_* и при слиянии имеют приоритет над сервером.
+    Адрес сервера и функция загрузки передаются снаружи, поэтому клиент
+    можно проверить на локальном http.server. С writer (persist.WriteBehind)
+    состояние сохраняется в фоновом потоке, а частые note_* склеиваются
+    в одну запись.
+    """
+
+    def __init__(self, base_url, state_file="sync_state.json", fetch=http_fetch, writer=None):
+        self.base_url = base_url.rstrip('/') + '/'
+        self.state_file = state_file
+        self.fetch = fetch
+        self.writer = writer
+        # Состояние меняется в главном потоке, а сериализуется в потоке писателя
+        self.lock = threading.RLock()
+        self.state = self._load_state()
+
+    def _load_state(self):
+        state = {}
+        if os.path.exists(self.state_file):
+            try:
+                with open(self.state_file, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                state = {}
+        state.setdefault('manifest', None)
+        state.setdefault('shard_ids', {})
+        for kind in ('created', 'edited', 'deleted'):
+            state.setdefault(kind, [])
+        return state
+
+    def save_state(self):
+        if self.writer is None:
+            self._write_state()
+        else:
+            self.writer.schedule(self.state_file, self._write_state)
+
+    def _write_state(self):
+        with self.lock:
+            text = json.dumps(self.state, ensure_ascii=False)
+        atomic_write(self.state_file, text)
+
+    # --- учет локальных изменений ---
+    def note_created(self, entry_id):
+        self._mark('created', entry_id)
+
+    def note_edited(self, entry_id):
+        if entry_id not in self.state['created']:
+            self._mark('edited', entry_id)
+
+    def note_deleted(self, entry_id):
+        if entry_id in self.state['created']:
+            # Запись, созданная локально, просто исчезает
+            with self.lock:
+                self.state['created'].remove(entry_id)
+            self.save_state()
+        else:
+            self._mark('deleted', entry_id)
+
+    def _mark(self, kind, entry_id):
+        if entry_id not in self.state[kind]:
+            with self.lock:
+                self.state[kind].append(entry_id)
+            self.save_state()
+
+    # --- загрузка ---
+    def fetch_changes(self):
+        """Скачивает манифест и только изменившиеся шарды"""
+        try:
+            manifest = json.loads(self.fetch(self.base_url + MANIFEST_FILE))
+        except urllib.error.HTTPError as e:
+            if e.code != 404:
+                raise
+            # Сервер еще не публикует шарды - берем весь data.json как один шард
+            entries = json.loads(self.fetch(self.base_url + LEGACY_FILE))
+            digest = _sha1(_shard_bytes(entries))
+            manifest = {
+                "version": 0,
+                "high_water": max((e['id'] for e in entries), default=0),
+                "shards": {LEGACY_FILE: {"hash": digest}},
+            }
+            known = (self.state['manifest'] or {}).get('shards', {})
+            if known.get(LEGACY_FILE, {}).get('hash') == digest:
+                return {"manifest": manifest, "shards": {}}
+            return {"manifest": manifest, "shards": {LEGACY_FILE: entries}}
+
+        known = (self.state['manifest'] or {}).get('shards', {})
+        shards = {}
+        for key, info in manifest['shards'].items():
+            if known.get(key, {}).get('hash') == info['hash']:
+                continue
+            data = self.fetch(self.base_url + info['file'])
+            if _sha1(data) != info['hash']:
+                raise ValueError(f"Шард {key} поврежден (не совпал хэш)")
+            shards[key] = json.loads(data)
+        return {"manifest": manifest, "shards": shards}
+
+    # --- слияние ---
+    def merge(self, store, changes):
+        """Применяет скачанные шарды к хранилищу, сохраняя локальные правки.
+
+        Возвращает словарь со счетчиками: сколько записей добавлено или
+        обновлено, удалено и сколько локальных записей получили новый id,
+        а в changed_ids - id всех затронутых записей (для точечного
+        обновления индексов в приложении).
+        """
+        manifest = changes['manifest']
+        created = set(self.state['created'])
+        edited = set(self.state['edited'])
+        deleted = set(self.state['deleted'])
+        # Копия: состояние подменяется целиком в конце, под блокировкой
+        shard_ids = dict(self.state['shard_ids'])
+        stats = {"updated": 0, "deleted": 0, "renumbered": 0, "shards": len(changes['shards'])}
+        changed = set()
+
+        # Шарды, исчезнувшие из манифеста, считаем опустевшими
+        shards = dict(changes['shards'])
+        for key in list(shard_ids):
+            if key not in manifest['shards']:
+                shards[key] = []
+
+        old_ids = {}  # id -> шард, в котором запись была раньше
+        new_ids = set()
+        for key, entries in shards.items():
+            old_ids.update(dict.fromkeys(shard_ids.pop(key, ()), key))
+            if entries:
+                shard_ids[key] = [e['id'] for e in entries]
+                new_ids.update(shard_ids[key])
+        # Запись могла переехать в шард, который не менялся
+        for ids in shard_ids.values():
+            new_ids.update(ids)
+
+        # Записи, пропавшие с сервера, удаляем, если их не правили локально
+        archived = {}
+        for entry_id in old_ids.keys() - new_ids:
+            if entry_id in edited or entry_id in created or entry_id in deleted:
+                continue
+            if store.get(entry_id):
+                store.delete(entry_id)
+                changed.add(entry_id)
+                stats['deleted'] += 1
+            else:
+                # Запись в архиве и не подгружена: убираем из файла ее месяца
+                # (у шарда data.json месяц неизвестен - ищем во всех)
+                key = old_ids[entry_id]
+                archived.setdefault(None if key == LEGACY_FILE else key, []).append(entry_id)
+        for month, ids in archived.items():
+            store.delete_archived(ids, month)
+
+        updates = []
+        collisions = {}
+        for entries in shards.values():
+            for entry in entries:
+                entry_id = entry['id']
+                if entry_id in created:
+                    collisions[entry_id] = entry
+                elif entry_id in edited or entry_id in deleted:
+                    continue
+                elif store.full(entry_id) != entry:
+                    updates.append(entry)
+
+        # Локально созданные записи, чей id занял сервер, переезжают на новые id
+        next_id = max(store.next_id(), manifest.get('high_water', 0) + 1)
+        for entry_id, remote in sorted(collisions.items()):
+            local = store.full(entry_id)
+            created.discard(entry_id)
+            if local is not None:
+                store.put(dict(local, id=next_id))
+                changed.add(next_id)
+                created.add(next_id)
+                next_id += 1
+                stats['renumbered'] += 1
+            updates.append(remote)
+
+        store.put_many(updates)
+        changed.update(entry['id'] for entry in updates)
+        stats['updated'] = len(updates)
+        stats['changed_ids'] = sorted(changed)
+
+        with self.lock:
+            self.state['shard_ids'] = shard_ids
+            self.state['manifest'] = manifest
+            self.state['created'] = sorted(created)
+            # Пометка удаления нужна, только пока сервер еще отдает запись
+            self.state['deleted'] = sorted(deleted & new_ids)
+        self.save_state()
+        return stats
@@ -0,0 +1,32 @@
+# ==========================================
+# Общие фикстуры тестов
+# Сеть заменяет локальный сервер benchmarks/server.py, файлы - временная папка
+# ==========================================
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from server import start_server  # noqa: E402
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Парсер и хранилище пишут файлы относительно текущей папки"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def server(tmp_path):
+    """Сервер со страницами из fixtures; файлы из tmp_path/published - как есть"""
+    published = tmp_path / "published"
+    published.mkdir()
+    server, base_url = start_server(static_dir=str(published))
+    yield base_url, published
+    server.shutdown()
+    server.server_close()
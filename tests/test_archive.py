@@ -0,0 +1,93 @@
+import json
+
+from archive import MonthArchive
+from storage import EntryStore
+
+
+def entry(entry_id, date, title=None):
+    return {"id": entry_id, "title": title or f"Запись {entry_id}", "category": "c", "content": f"Текст {entry_id}", "date": date}
+
+
+ENTRIES = [entry(1, "2026-05-03"), entry(2, "2026-06-10"), entry(3, "2026-07-01"), entry(4, "2026-08-15")]
+
+
+def make_store(tmp_path):
+    store = EntryStore(str(tmp_path / "data.json"))
+    store.load()
+    store.replace_all(ENTRIES)
+    return store
+
+
+def reopen(tmp_path):
+    store = EntryStore(str(tmp_path / "data.json"))
+    store.load()
+    return store
+
+
+def test_archive_old_moves_old_months(tmp_path):
+    store = make_store(tmp_path)
+    assert sorted(store.archive_old(2)) == [1, 2]
+    assert sorted(store.entries) == [3, 4]
+    with open(tmp_path / "data.json", encoding='utf-8') as f:
+        assert [e['id'] for e in json.load(f)] == [3, 4]
+    assert store.archive_months() == ["2026-06", "2026-05"]
+    assert [e.id for e in store.page_in("2026-06")] == [2]
+    assert store.full(2) == ENTRIES[1]
+
+
+def test_edits_during_archiving_are_kept(tmp_path, monkeypatch):
+    """Правка и удаление, сделанные, пока пишется архив, не теряются"""
+    store = make_store(tmp_path)
+    add = MonthArchive.add
+
+    def add_and_edit(archive, entries):
+        result = add(archive, entries)
+        # Главный поток правит записи, пока фоновый пишет снимок
+        store.put(dict(ENTRIES[0], title="Правка во время архивации"))
+        store.delete(2)
+        store.put(entry(5, "2026-08-20"))
+        return result
+
+    monkeypatch.setattr(MonthArchive, "add", add_and_edit)
+    assert store.archive_old(2) == []
+    monkeypatch.undo()
+
+    assert store.get(1).title == "Правка во время архивации"
+    assert store.get(2) is None
+    assert store.full(5) == entry(5, "2026-08-20")
+    reopened = reopen(tmp_path)
+    assert sorted(reopened.entries) == [1, 3, 4, 5]
+    assert reopened.get(1).title == "Правка во время архивации"
+    # Удаленная запись не возвращается из архива
+    assert reopened.page_in("2026-06") == []
+
+
+def test_page_out_keeps_edited_entries(tmp_path):
+    store = make_store(tmp_path)
+    store.archive_old(2)
+    store.page_in("2026-06")
+    store.page_in("2026-05")
+    store.put(dict(ENTRIES[0], title="Правка после подгрузки"))
+    assert store.page_out(["2026-06", "2026-05"]) == [2]
+    assert sorted(store.entries) == [1, 3, 4]
+    assert store.get(1).title == "Правка после подгрузки"
+    assert store.archive_months() == ["2026-06", "2026-05"]
+    # Выгруженный месяц подгружается снова
+    assert [e.id for e in store.page_in("2026-06")] == [2]
+
+
+def test_month_list_is_cached_and_kept_current(tmp_path, monkeypatch):
+    store = make_store(tmp_path)
+    store.archive_old(2)
+    assert store.archive_months() == ["2026-06", "2026-05"]
+
+    def listdir(path):
+        raise AssertionError("список месяцев берется из кэша")
+
+    monkeypatch.setattr("archive.os.listdir", listdir)
+    store.page_in("2026-06")
+    assert store.archive_months() == ["2026-05"]
+    # Файл месяца опустел и удален - месяц пропадает из списка
+    store.delete_archived([1], "2026-05")
+    assert store.archive_months() == []
+    assert store.archive.months() == ["2026-06"]
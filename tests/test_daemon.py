@@ -0,0 +1,43 @@
+import os
+
+import parser as parser_module
+from parser import NewsParser
+from scheduler import PollScheduler
+from sources import HackerNewsSource
+
+
+def test_failed_cycle_does_not_stop_daemon(workdir, server, monkeypatch):
+    """Сбой публикации в первом цикле: демон работает дальше и публикует во втором"""
+    base_url, _ = server
+    monkeypatch.setattr(HackerNewsSource, "url", base_url + "/news/")
+    publish_shards = parser_module.publish_shards
+    calls = []
+
+    def publish_once_failing(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 1:
+            raise OSError("диск переполнен")
+        return publish_shards(*args, **kwargs)
+
+    monkeypatch.setattr(parser_module, "publish_shards", publish_once_failing)
+    now = [0.0]
+    scheduler = PollScheduler({"hacker_news": HackerNewsSource}, path=None, clock=lambda: now[0])
+    cycles = []
+
+    def on_cycle(due, added):
+        cycles.append(added)
+        now[0] += 10 ** 6  # следующий опрос - сразу
+
+    parser = NewsParser(rate_per_host=1000, burst=100, http_cache_dir=None, article_cache_dir=None)
+    try:
+        assert parser.run_daemon(scheduler, max_cycles=2, on_cycle=on_cycle) == 2
+        failed = parser.metrics.counters.get("daemon.failed_cycles")
+    finally:
+        parser.close()
+
+    # Первый цикл считается пустым, второй ничего нового не нашел, но досохранил шарды
+    assert cycles == [0, 0]
+    assert failed == 1
+    assert scheduler.state["hacker_news"]["items"] == 0
+    assert len(calls) == 2
+    assert os.path.exists("manifest.json")
@@ -0,0 +1,52 @@
+from dedup import DedupIndex, canonical_url
+from parser import NewsParser
+from sources import HackerNewsSource
+
+
+def add_tracking(url):
+    return url + ("&" if "?" in url else "?") + "utm_source=rss&utm_medium=feed&fbclid=abc#comments"
+
+
+def test_canonical_url_drops_only_tracking_params():
+    url = "https://example.com/post?id=7"
+    assert canonical_url("http://www.example.com/post/?utm_campaign=x&id=7&ref=hn#top") == url
+    assert canonical_url("https://example.com/post?id=8&gclid=1") != url
+
+
+def test_same_url_with_tracking_params_is_skipped(workdir, server, monkeypatch):
+    """Повторный обход: ссылки с метками и другими заголовками - те же статьи"""
+    base_url, _ = server
+    monkeypatch.setattr(HackerNewsSource, "url", base_url + "/news/")
+
+    def run():
+        parser = NewsParser(rate_per_host=1000, burst=100, http_cache_dir=None, article_cache_dir=None)
+        try:
+            return parser, parser.run_all(["hacker_news"])
+        finally:
+            parser.close()
+
+    _, added = run()
+    assert added == HackerNewsSource.limit
+
+    make_row = HackerNewsSource.make_row
+
+    def make_tracked_row(self, row):
+        row = make_row(self, row)
+        # Заголовок другой, так что совпасть может только канонический URL
+        return {"title": row['title'] + " обновлено", "url": add_tracking(row['url'])}
+
+    monkeypatch.setattr(HackerNewsSource, "make_row", make_tracked_row)
+    parser, added = run()
+    assert added == 0
+    assert parser.metrics.counters["dedup.hits"] == HackerNewsSource.limit
+
+
+def test_dedup_index_survives_reload(workdir):
+    index = DedupIndex("dedup_index.json")
+    index.add("https://example.com/a?utm_source=x", "Новость")
+    index.save()
+
+    reloaded = DedupIndex("dedup_index.json").load()
+    assert reloaded.seen("https://www.example.com/a/")
+    assert reloaded.seen(title="новость!")
+    assert not reloaded.seen("https://example.com/b", "Другая новость")
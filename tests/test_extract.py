@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+from extract import DEFAULT_BACKEND, ArticleStream, extract_article
+from metrics import RunMetrics
+from net import CachedSession
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "fixtures")
+LONG = "x" * 45
+
+
+def stream_article(html, chunk=7, **kwargs):
+    """ArticleStream, которому страница подается маленькими кусками"""
+    parser = ArticleStream(**kwargs)
+    for start in range(0, len(html), chunk):
+        parser.feed(html[start:start + chunk])
+    parser.close()
+    return parser.result()
+
+
+@pytest.mark.parametrize("max_paragraphs", [3, 0])
+def test_stream_matches_tree_on_article_fixture(max_paragraphs):
+    with open(os.path.join(FIXTURES, "article.html"), encoding='utf-8') as f:
+        html = f.read()
+    expected = extract_article(html, max_paragraphs=max_paragraphs)
+    assert expected
+    assert stream_article(html, max_paragraphs=max_paragraphs) == expected
+
+
+@pytest.mark.parametrize("html", [
+    # Код внутри абзаца (и "</p>" в строке скрипта) - не текст
+    f'<div class="main-content"><p>a{LONG}<script>var x="</p>";</script>z</p></div>',
+    f'<div class="main-content"><p>a{LONG}<style>p {{color: red}}</style>z</p></div>',
+    # Абзац без main-content и main-content без абзацев
+    f'<p>a{LONG}</p>',
+    '<section class="main-content"><p>коротко</p></section>',
+])
+def test_stream_matches_tree_on_edge_cases(html):
+    assert stream_article(html, max_paragraphs=0) == extract_article(html, max_paragraphs=0)
+
+
+@pytest.mark.skipif(DEFAULT_BACKEND != "lxml", reason="закрытие <p> блоками - поведение lxml")
+@pytest.mark.parametrize("html", [
+    # Вложенный блок закрывает абзац, текст после него уже не в абзаце
+    f'<div class="main-content"><p>a{LONG}<div>b{LONG}</div>c{LONG}</p><p>d{LONG}</p></div>',
+    f'<div class="main-content"><p>a{LONG}<ul><li>b{LONG}</li></ul>c{LONG}</p></div>',
+    f'<div class="main-content"><p>a{LONG}<table><tr><td>t{LONG}</td></tr></table>z{LONG}</p></div>',
+    # Конец блока вокруг незакрытого абзаца
+    f'<div class="main-content"><div><p>a{LONG}</div>b{LONG}</p><p>c{LONG}</div><p>after{LONG}</p>',
+    f'<section class="main-content"><section><p>a{LONG}</section>b{LONG}</p></section>',
+    # А <section> внутри абзаца его не закрывает
+    f'<section class="main-content"><p>a{LONG}<section>s{LONG}</section>t{LONG}</p></section><p>out{LONG}</p>',
+])
+def test_stream_closes_paragraphs_like_lxml(html):
+    assert stream_article(html, max_paragraphs=0) == extract_article(html, max_paragraphs=0)
+
+
+def test_streamed_body_stops_at_max_bytes(server):
+    base_url, _ = server
+    metrics = RunMetrics()
+    session = CachedSession(None, metrics=metrics)
+    try:
+        with session.stream(base_url + "/articles/post.html", max_bytes=1000, chunk_size=300) as body:
+            data = b"".join(body)
+        assert len(data) == body.nbytes == 1000
+        assert body.truncated
+        with session.stream(base_url + "/articles/post.html", chunk_size=300) as body:
+            full = b"".join(body)
+        assert not body.truncated
+        assert full.startswith(data) and len(full) > 1000
+    finally:
+        session.close()
+    # В отчет попадает только прочитанный объем
+    assert [request['bytes'] for request in metrics.requests][0] == 1000
@@ -0,0 +1,29 @@
+from facets import CategoryFacets
+
+
+def entry(entry_id, category):
+    return {"id": entry_id, "category": category}
+
+
+def test_older_entries_go_first_and_match_a_rebuild():
+    """Подгруженные месяцы архива встают в начало категорий, как при полной пересборке"""
+    live = [entry(10, "a"), entry(11, "b"), entry(12, "a")]
+    june = [entry(5, "a"), entry(6, "c")]
+    may = [entry(1, "b"), entry(2, "a")]
+    facets = CategoryFacets()
+    facets.build(live)
+    facets.add_older(june)
+    facets.add_older(may)
+    facets.remove(5)
+    facets.add(13, "c")
+
+    rebuilt = CategoryFacets()
+    rebuilt.build(may + [entry(6, "c")] + live + [entry(13, "c")])
+    assert facets.counts() == rebuilt.counts() == [("a", 3), ("b", 2), ("c", 2)]
+    for category in "abc":
+        assert list(facets.entries_in(category)) == list(rebuilt.entries_in(category))
+    assert list(facets.entries_in("a")) == [2, 10, 12]
+
+    facets.remove(6)
+    facets.remove(13)
+    assert "c" not in dict(facets.counts())
@@ -0,0 +1,44 @@
+from parser import NewsParser
+from sources import PythonOrgSource
+
+
+def run(fetched, content=None):
+    """Один запуск python_org; fetched - адреса статей, которые парсер пробовал скачать"""
+    parser = NewsParser(rate_per_host=1000, burst=100, http_cache_dir=None, article_cache_dir=None, retry_delay=0)
+
+    def get_article_content(url):
+        fetched.append(url)
+        return content
+
+    parser.get_article_content = get_article_content
+    try:
+        return parser, parser.run_all(["python_org"])
+    finally:
+        parser.close()
+
+
+def test_waiting_retry_is_not_refetched_from_listing(workdir, server, monkeypatch):
+    """Статья из очереди повторов, которой еще рано, не качается снова, хотя она есть в списке"""
+    base_url, _ = server
+    monkeypatch.setattr(PythonOrgSource, "url", base_url + "/blogs/")
+
+    failed = []
+    parser, added = run(failed)
+    assert added == 0
+    assert failed and len(parser.retry_queue) == len(failed)
+
+    fetched = []
+    parser, added = run(fetched, "Текст")
+    assert fetched == []
+    assert added == 0
+    assert all(item['attempts'] == 1 for item in parser.retry_queue.items.values())
+
+    # Время повтора пришло - статьи качаются и уходят из очереди
+    for item in parser.retry_queue.items.values():
+        item['next_try'] = 0
+    parser.retry_queue.dirty = True
+    parser.retry_queue.save()
+    parser, added = run(fetched, "Текст")
+    assert sorted(fetched) == sorted(failed)
+    assert added == len(failed)
+    assert len(parser.retry_queue) == 0
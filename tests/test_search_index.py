@@ -0,0 +1,24 @@
+from search_index import SearchIndex
+
+ENTRIES = [
+    {"id": 1, "title": "Python", "content": "Высокоуровневый язык программирования"},
+    {"id": 2, "title": "Kivy", "content": "Фреймворк на Python для мобильных приложений"},
+    {"id": 3, "title": "Linux kernel", "content": "Ядро операционной системы"},
+]
+QUERIES = ["py", "python", "язык", "pyt фрейм", "linux ядро", "ker", "zzz", ""]
+
+
+def test_matches_agrees_with_search():
+    index = SearchIndex()
+    index.build(ENTRIES)
+    for query in QUERIES:
+        found = set(index.search(query))
+        assert {e['id'] for e in ENTRIES if index.matches(e['id'], query)} == found, query
+
+
+def test_matches_sees_updated_entry():
+    index = SearchIndex()
+    index.build(ENTRIES)
+    index.update(dict(ENTRIES[2], title="Git", content="Контроль версий"))
+    assert not index.matches(3, "linux")
+    assert index.matches(3, "конт")
@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+from storage import EntryStore
+
+ENTRIES = [
+    {"id": 1, "title": "Python", "category": "Программирование", "content": "Язык программирования", "date": "2026-08-01"},
+    {"id": 2, "title": "Kivy", "category": "Программирование", "content": "Фреймворк для интерфейсов", "date": "2026-08-02"},
+    {"id": 3, "title": "JSON", "category": "Форматы данных", "content": "Формат обмена данными", "date": "2026-08-03"},
+]
+
+
+def make_store(tmp_path):
+    """Хранилище со снимком из ENTRIES и тремя изменениями в журнале"""
+    store = EntryStore(str(tmp_path / "data.json"))
+    store.load()
+    store.replace_all(ENTRIES)
+    store.put(dict(ENTRIES[0], title="Python 3"))
+    store.put({"id": 4, "title": "Git", "category": "Инструменты", "content": "Система контроля версий", "date": "2026-08-04"})
+    store.delete(2)
+    return store
+
+
+def snapshot(store):
+    return sorted(store.iter_full(), key=lambda e: e['id'])
+
+
+def reopen(tmp_path):
+    store = EntryStore(str(tmp_path / "data.json"))
+    store.load()
+    return store
+
+
+def test_journal_survives_reopen(tmp_path):
+    store = make_store(tmp_path)
+    expected = snapshot(store)
+    assert [e['id'] for e in expected] == [1, 3, 4]
+    assert snapshot(reopen(tmp_path)) == expected
+
+
+def test_crash_before_snapshot_install_keeps_journal(tmp_path, monkeypatch):
+    """Сжатие упало после записи временных файлов: data.json и журнал прежние"""
+    store = make_store(tmp_path)
+    expected = snapshot(store)
+
+    def crash(*args, **kwargs):
+        raise RuntimeError("процесс убит")
+
+    monkeypatch.setattr(EntryStore, "_install_snapshot", crash)
+    with pytest.raises(RuntimeError):
+        store.compact()
+    monkeypatch.undo()
+
+    with open(tmp_path / "data.json", encoding='utf-8') as f:
+        assert [e['id'] for e in json.load(f)] == [1, 2, 3]
+    assert (tmp_path / "data.journal.jsonl").exists()
+    assert snapshot(reopen(tmp_path)) == expected
+
+
+def test_crash_after_snapshot_install_replays_journal(tmp_path):
+    """Снимок уже подменен, а журнал не успели удалить: повтор журнала ничего не ломает"""
+    store = make_store(tmp_path)
+    expected = snapshot(store)
+    journal = (tmp_path / "data.journal.jsonl").read_text(encoding='utf-8')
+
+    store.compact()
+    assert not (tmp_path / "data.journal.jsonl").exists()
+    (tmp_path / "data.journal.jsonl").write_text(journal, encoding='utf-8')
+
+    reopened = reopen(tmp_path)
+    assert snapshot(reopened) == expected
+    assert reopened.next_id() == 5
+
+
+def test_torn_last_journal_line_is_ignored(tmp_path):
+    store = make_store(tmp_path)
+    expected = snapshot(store)
+    with open(tmp_path / "data.journal.jsonl", 'a', encoding='utf-8') as f:
+        f.write('{"op": "put", "entry": {"id": 5, "tit')
+    assert snapshot(reopen(tmp_path)) == expected
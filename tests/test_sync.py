@@ -0,0 +1,130 @@
+from storage import EntryStore
+from sync import DeltaSyncClient, publish_shards
+
+
+def entry(entry_id, title, date="2026-08-01"):
+    return {"id": entry_id, "title": title, "category": "Новости IT", "content": f"Текст: {title}", "date": date}
+
+
+def make_client(tmp_path, base_url):
+    app = tmp_path / "app"
+    app.mkdir(exist_ok=True)
+    store = EntryStore(str(app / "data.json"))
+    store.load()
+    client = DeltaSyncClient(base_url, state_file=str(app / "sync_state.json"))
+    return store, client
+
+
+def sync(store, client):
+    return client.merge(store, client.fetch_changes())
+
+
+def test_first_sync_downloads_all_shards(tmp_path, server):
+    base_url, published = server
+    publish_shards([entry(1, "A"), entry(2, "B", "2026-07-01")], out_dir=str(published))
+    store, client = make_client(tmp_path, base_url)
+
+    stats = sync(store, client)
+    assert stats['shards'] == 2
+    assert store.full(2) == entry(2, "B", "2026-07-01")
+
+    # Манифест не изменился - второй раз не качается ни один шард
+    assert sync(store, client)['shards'] == 0
+
+
+def test_local_entry_with_colliding_id_is_renumbered(tmp_path, server):
+    base_url, published = server
+    publish_shards([entry(1, "A"), entry(2, "B")], out_dir=str(published))
+    store, client = make_client(tmp_path, base_url)
+    sync(store, client)
+
+    local_id = store.next_id()
+    store.put(entry(local_id, "Локальная"))
+    client.note_created(local_id)
+    # Тем временем парсер опубликовал запись с тем же id
+    publish_shards([entry(1, "A"), entry(2, "B"), entry(3, "C"), entry(4, "D")], out_dir=str(published))
+
+    stats = sync(store, client)
+    assert local_id == 3
+    assert stats['renumbered'] == 1
+    assert store.get(3).title == "C"
+    assert store.get(4).title == "D"
+    assert store.get(5).title == "Локальная"
+    assert client.state['created'] == [5]
+
+
+def test_remote_deletions_keep_local_edits(tmp_path, server):
+    base_url, published = server
+    publish_shards([entry(1, "A"), entry(2, "B"), entry(3, "C")], out_dir=str(published))
+    store, client = make_client(tmp_path, base_url)
+    sync(store, client)
+
+    store.put(dict(entry(3, "C"), title="C (исправлено)"))
+    client.note_edited(3)
+    publish_shards([entry(1, "A")], out_dir=str(published))
+
+    stats = sync(store, client)
+    assert stats['deleted'] == 1
+    assert store.get(2) is None
+    assert store.get(3).title == "C (исправлено)"
+    assert sorted(stats['changed_ids']) == [2]
+
+
+def test_locally_deleted_entry_is_not_restored(tmp_path, server):
+    base_url, published = server
+    publish_shards([entry(1, "A"), entry(2, "B")], out_dir=str(published))
+    store, client = make_client(tmp_path, base_url)
+    sync(store, client)
+
+    store.delete(2)
+    client.note_deleted(2)
+    publish_shards([entry(1, "A"), entry(2, "B (новое)"), entry(3, "C")], out_dir=str(published))
+
+    sync(store, client)
+    assert store.get(2) is None
+    assert store.get(3).title == "C"
+
+
+def test_legacy_data_json_without_manifest(tmp_path, server):
+    """Сервер без manifest.json: весь data.json как один шард"""
+    base_url, published = server
+    (published / "data.json").write_text('[{"id": 7, "title": "Старый формат", "category": "c", "content": "", "date": ""}]',
+                                         encoding='utf-8')
+    store, client = make_client(tmp_path, base_url)
+
+    stats = sync(store, client)
+    assert stats['updated'] == 1
+    assert store.get(7).title == "Старый формат"
+
+
+def test_remote_deletion_reaches_archived_entries(tmp_path, server):
+    """Запись, удаленная на сервере, пока она лежит в архиве, не возвращается при подгрузке"""
+    base_url, published = server
+    publish_shards([entry(1, "A", "2026-05-01"), entry(2, "B", "2026-05-02"), entry(3, "C")], out_dir=str(published))
+    store, client = make_client(tmp_path, base_url)
+    sync(store, client)
+    assert sorted(store.archive_old(1)) == [1, 2]
+
+    publish_shards([entry(1, "A", "2026-05-01"), entry(3, "C")], out_dir=str(published))
+    sync(store, client)
+    # Запись 1 пришла в измененном шарде заново (в приложении ее снова уберет архивация)
+    assert store.get(1).title == "A"
+    assert store.get(2) is None
+    assert store.page_in("2026-05") == []
+
+
+def test_deletion_marks_are_pruned(tmp_path, server):
+    base_url, published = server
+    publish_shards([entry(1, "A"), entry(2, "B")], out_dir=str(published))
+    store, client = make_client(tmp_path, base_url)
+    sync(store, client)
+
+    store.delete(2)
+    client.note_deleted(2)
+    sync(store, client)
+    # Сервер еще отдает запись - пометка нужна, чтобы она не вернулась
+    assert client.state['deleted'] == [2]
+
+    publish_shards([entry(1, "A")], out_dir=str(published))
+    sync(store, client)
+    assert client.state['deleted'] == []